@@ -0,0 +1,11 @@
+# build the site in N shards as separate processes, then merge them
+n=${1:-4}
+pids=""
+for i in $(seq 1 "$n"); do
+    python3 src/main.py "/site-generator/" --shard "$i/$n" &
+    pids="$pids $!"
+done
+for pid in $pids; do
+    wait "$pid" || exit 1
+done
+python3 src/main.py merge "$n"
@@ -0,0 +1,156 @@
+import copy, hashlib, json, os, posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import hash_file
+from sync import DEFAULT_WORKERS, scan_files, stamp
+
+# static files served under a content-hashed name; anything else (e.g.
+# favicon.ico, robots.txt) keeps the well-known name clients ask for
+FINGERPRINT_EXTENSIONS = {
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".woff", ".woff2",
+}
+FINGERPRINT_LENGTH = 8
+
+
+def is_fingerprinted(path):
+    return posixpath.splitext(path)[1].lower() in FINGERPRINT_EXTENSIONS
+
+def fingerprinted_url(url, digest):
+    # /index.css -> /index.3fa9c1d2.css
+    root, ext = posixpath.splitext(url)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+def fingerprint_assets(static_dir, old=None, workers=DEFAULT_WORKERS):
+    # Every fingerprinted file under static_dir as url -> {"size", "mtime",
+    # "hash", "url"}, where "url" is the name it's served under. Hashes of
+    # files whose size and mtime match their entry in old (the last
+    # build's map) are reused rather than recomputed.
+    old = old or {}
+    entries = {}
+    pending = []
+    for rel, stat in sorted(scan_files(static_dir).items()):
+        url = "/" + rel.replace(os.sep, "/")
+        if not is_fingerprinted(url):
+            continue
+        entry = stamp(stat)
+        previous = old.get(url, {})
+        if "hash" in previous and all(previous.get(key) == value for key, value in entry.items()):
+            entry["hash"] = previous["hash"]
+        else:
+            pending.append((url, os.path.join(static_dir, rel)))
+        entries[url] = entry
+    if len(pending) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(hash_file, [path for url, path in pending]))
+    else:
+        digests = [hash_file(path) for url, path in pending]
+    for (url, path), digest in zip(pending, digests):
+        entries[url]["hash"] = digest
+    for url, entry in entries.items():
+        entry["url"] = fingerprinted_url(url, entry["hash"])
+    return entries
+
+def asset_renames(entries):
+    # static-relative path -> the path it's copied to, for sync_tree
+    return {url[1:].replace("/", os.sep): entry["url"][1:].replace("/", os.sep) for url, entry in entries.items()}
+
+def changed_assets(old, new):
+    # URLs whose fingerprinted name differs between two maps, including
+    # assets that appeared or disappeared
+    old, new = old or {}, new or {}
+    return sorted(url for url in old.keys() | new.keys()
+                  if old.get(url, {}).get("url") != new.get(url, {}).get("url"))
+
+def is_root_url(url):
+    return url.startswith("/") and not url.startswith("//")
+
+def path_of(url):
+    # the URL without its ?query or #fragment
+    end = len(url)
+    for mark in "?#":
+        i = url.find(mark, 0, end)
+        if i >= 0:
+            end = i
+    return url[:end]
+
+def site_path(url, page_url=None):
+    # the root path url points at, without its ?query or #fragment: root
+    # URLs as they are, relative ones joined to the directory of page_url
+    # (the output URL of the page they're on) if given; None for off-site
+    # and in-page URLs
+    path = path_of(url)
+    if is_root_url(path):
+        return path
+    if page_url is None or not path or path.startswith("/") or ":" in path.split("/", 1)[0]:
+        return None
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page_url), path))
+
+def asset_urls(urls, page_url=None):
+    # which of urls (hrefs and srcs as written, on the page at page_url)
+    # point at an asset that is, or could become, fingerprinted: what a
+    # page depends on the map for
+    paths = (site_path(url, page_url) for url in urls)
+    return sorted({path for path in paths if path is not None and is_fingerprinted(path)})
+
+
+class AssetMap():
+    # Site URL of each static asset -> the fingerprinted URL it's actually
+    # served at; what page and template URLs are rewritten through. images
+    # holds what an <img> of each measured image gets (see scan_images).
+    # The digest identifies the whole map in cache keys. A map bound to a
+    # page with at() resolves the page's relative URLs too.
+
+    def __init__(self, urls=None, images=None):
+        self.urls = urls if urls is not None else {}
+        self.images = images if images is not None else {}
+        self.page = None
+        h = hashlib.blake2b(digest_size=8)
+        for url, target in sorted(self.urls.items()):
+            h.update(f"{url}\0{target}\0".encode())
+        for url, image in sorted(self.images.items()):
+            h.update(json.dumps([url, image["width"], image["height"], image["srcset"]]).encode())
+        self.digest = h.hexdigest()
+
+    def __eq__(self, other):
+        if not isinstance(other, AssetMap):
+            return False
+        return self.urls == other.urls and self.images == other.images
+
+    def __repr__(self):
+        return f"AssetMap({len(self.urls)} assets, {len(self.images)} images, {self.digest})"
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    @classmethod
+    def from_entries(cls, entries, images=None):
+        return cls({url: entry["url"] for url, entry in (entries or {}).items()}, images)
+
+    def at(self, page_url):
+        # the same map for the page whose output URL is page_url
+        bound = copy.copy(self)
+        bound.page = page_url
+        return bound
+
+    def image(self, url):
+        path = site_path(url, self.page)
+        if path is None:
+            return None
+        return self.images.get(path)
+
+    def resolve(self, url):
+        # a ?query or #fragment is carried over, and a relative URL stays
+        # relative: only its file name changes
+        path = site_path(url, self.page)
+        if path is None:
+            return url
+        target = self.urls.get(path)
+        if target is None:
+            return url
+        written = path_of(url)
+        if written == path:
+            return target + url[len(path):]
+        return written[:written.rfind("/") + 1] + posixpath.basename(target) + url[len(written):]
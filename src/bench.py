@@ -0,0 +1,145 @@
+import argparse, contextlib, gc, io, json, os, random, shutil, sys, tempfile, time, tracemalloc
+
+from corpus import code_block, inline_text, make_page, write_corpus
+from textnode import text_to_textnodes
+from markdown_blocks import markdown_to_html_node
+from main import build, generate_page
+
+# sizes of the generated inputs; "full" is roughly our largest site
+SCALES = {
+    "small": {"pages": 200, "long_words": 20000, "links": 2000, "code_lines": 5000},
+    "full": {"pages": 10000, "long_words": 200000, "links": 20000, "code_lines": 50000},
+}
+
+
+def measure(func, repeat=3):
+    # best wall time over `repeat` runs, then one more run under
+    # tracemalloc for the peak Python heap (kept separate so tracing
+    # doesn't skew the timing)
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+class Result():
+
+    def __init__(self, name, seconds, peak, units, unit):
+        self.name = name
+        self.seconds = seconds
+        self.peak = peak
+        self.units = units
+        self.unit = unit
+
+    def __repr__(self):
+        return f"Result({self.name}, {self.seconds:.4f}s)"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "peak_bytes": self.peak,
+            "throughput": self.units / self.seconds if self.seconds else 0,
+            "unit": self.unit,
+        }
+
+    def line(self):
+        rate = self.units / self.seconds if self.seconds else 0
+        return (f"{self.name:<34}{self.seconds * 1000:>11.1f} ms{rate:>14.1f} {self.unit + '/s':<9}"
+                f"{self.peak / 2**20:>9.1f} MB peak")
+
+
+def bench_inline(scale, root):
+    rng = random.Random(1)
+    long_text = inline_text(rng, scale["long_words"])
+    link_text = inline_text(rng, scale["links"] * 5, links=scale["links"])
+    yield "text_to_textnodes long paragraph", lambda: text_to_textnodes(long_text), len(long_text) / 2**20, "MB"
+    yield "text_to_textnodes many links", lambda: text_to_textnodes(link_text), scale["links"], "links"
+
+def bench_markdown(scale, root):
+    rng = random.Random(2)
+    page = "\n\n".join(make_page(rng, f"Page {i}") for i in range(50))
+    code = "# Code\n\n" + code_block(rng, scale["code_lines"])
+    yield "markdown_to_html_node 50 pages", lambda: markdown_to_html_node(page), len(page) / 2**20, "MB"
+    yield "markdown_to_html_node code block", lambda: markdown_to_html_node(code), len(code) / 2**20, "MB"
+    node = markdown_to_html_node(page)
+    yield "ParentNode.to_html 50 pages", node.to_html, len(page) / 2**20, "MB"
+    wide = markdown_to_html_node(inline_text(rng, scale["links"] * 5, links=scale["links"]))
+    yield "ParentNode.to_html many siblings", wide.to_html, scale["links"], "links"
+
+def bench_site(scale, root):
+    content, static, template = write_corpus(os.path.join(root, "site"), pages=scale["pages"], depth=4)
+    docs = os.path.join(root, "docs")
+    manifest = os.path.join(root, "manifest.json")
+    src = os.path.join(root, "site", "page.md")
+    with open(src, "w") as f:
+        f.write(make_page(random.Random(3), "One page", paragraphs=40, links=200))
+    dest = os.path.join(root, "page.html")
+
+    def quiet(func, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+
+    yield "generate_page", lambda: quiet(generate_page, src, template, dest, "/site/"), 1, "pages"
+
+    def full_build():
+        shutil.rmtree(docs, ignore_errors=True)
+        quiet(build, "/site/", content_dir=content, static_dir=static, docs_dir=docs,
+              template_path=template, manifest_path=manifest)
+    yield f"main build {scale['pages']} pages", full_build, scale["pages"], "pages"
+
+    quiet(build, "/site/", content_dir=content, static_dir=static, docs_dir=docs,
+          template_path=template, manifest_path=manifest)
+    yield (f"incremental no-op {scale['pages']} pages",
+           lambda: quiet(build, "/site/", incremental=True, content_dir=content, static_dir=static,
+                         docs_dir=docs, template_path=template, manifest_path=manifest),
+           scale["pages"], "pages")
+
+SUITES = {
+    "inline": bench_inline,
+    "markdown": bench_markdown,
+    "site": bench_site,
+}
+
+def run(scale_name="small", only=None, repeat=3):
+    scale = SCALES[scale_name]
+    results = []
+    root = tempfile.mkdtemp(prefix="site-bench-")
+    try:
+        for suite, make in SUITES.items():
+            if only and suite not in only:
+                continue
+            for name, func, units, unit in make(scale, root):
+                seconds, peak = measure(func, repeat)
+                result = Result(name, seconds, peak, units, unit)
+                print(result.line())
+                results.append(result)
+    finally:
+        shutil.rmtree(root)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the parser and builder on synthetic corpora")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="run only these suites")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    results = run(args.scale, args.only, args.repeat)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scale": args.scale, "results": [r.to_dict() for r in results]}, f, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import gzip, os
+from concurrent.futures import ThreadPoolExecutor
+
+from pageio import write_bytes
+from sync import stamp
+
+# optional: .br and .zst siblings are only written when these are installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# formats that are already compressed, where another pass only costs time
+PRECOMPRESSED = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+    ".woff", ".woff2", ".zip", ".gz", ".br", ".zst",
+    ".mp3", ".mp4", ".webm", ".ogg",
+}
+DEFAULT_THREADS = os.cpu_count() or 1
+
+
+def _gzip(data):
+    # mtime=0 so the same output always compresses to the same bytes
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+def _zstd(data):
+    # a compressor per call: they aren't safe to share between threads
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+def available_formats():
+    # sibling suffix -> compress function
+    formats = {".gz": _gzip}
+    if brotli is not None:
+        formats[".br"] = _brotli
+    if zstandard is not None:
+        formats[".zst"] = _zstd
+    return formats
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() not in PRECOMPRESSED
+
+def siblings(path, entry):
+    return [path + suffix for suffix in entry["formats"]]
+
+def compress_file(path, formats):
+    with open(path, "rb") as f:
+        data = f.read()
+    for suffix, compress in formats.items():
+        write_bytes(path + suffix, compress(data))
+
+
+class CompressResult():
+
+    def __init__(self):
+        self.entries = {}
+        self.compressed = []
+        self.skipped = 0
+
+    def __repr__(self):
+        return f"CompressResult({len(self.compressed)} compressed, {self.skipped} unchanged)"
+
+
+def compress_outputs(outputs, old, threads=DEFAULT_THREADS, formats=None):
+    # Writes a precompressed sibling (page.html.gz, ...) next to each
+    # compressible output. An output whose size and mtime match the entry
+    # `old` has for it (from the last build's manifest), compressed into
+    # the same formats, is skipped as long as its siblings still exist.
+    # Entries are {"size", "mtime", "formats"} keyed by output path.
+    formats = available_formats() if formats is None else formats
+    result = CompressResult()
+    pending = []
+    for path in sorted(outputs):
+        if not is_compressible(path):
+            continue
+        entry = dict(stamp(os.stat(path)), formats=sorted(formats))
+        result.entries[path] = entry
+        if old.get(path) == entry and all(os.path.exists(sibling) for sibling in siblings(path, entry)):
+            result.skipped += 1
+        else:
+            pending.append(path)
+    if len(pending) > 1 and threads > 1:
+        # zlib, brotli and zstd all release the GIL while compressing
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda path: compress_file(path, formats), pending))
+    else:
+        for path in pending:
+            compress_file(path, formats)
+    result.compressed = pending
+    return result
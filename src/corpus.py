@@ -0,0 +1,98 @@
+import os, random
+
+# Deterministic synthetic markdown for benchmarks: the same seed and
+# arguments always produce byte-identical pages.
+
+WORDS = (
+    "elf hobbit ring shire mordor wizard river forest mountain road tower "
+    "song king sword stone star ship dragon dwarf hall gate lake bridge "
+    "fire shadow light grey white black tree leaf wind rain"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def inline_text(rng, count, links=0):
+    # plain words with bold, italic and code spans, plus `links` links and
+    # an image every tenth link, spread evenly through the text
+    parts = []
+    step = max(1, count // (links + 1)) if links else 0
+    link = 0
+    for i in range(count):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.03:
+            word = f"**{word}**"
+        elif roll < 0.06:
+            word = f"_{word}_"
+        elif roll < 0.08:
+            word = f"`{word}`"
+        parts.append(word)
+        if step and i % step == step - 1 and link < links:
+            if link % 10 == 9:
+                parts.append(f"![{word}](/images/{word}-{link}.png)")
+            else:
+                parts.append(f"[{word} {link}](/pages/{word}/{link})")
+            link += 1
+    return " ".join(parts)
+
+def code_block(rng, lines):
+    body = "\n".join(f"    let {rng.choice(WORDS)}_{i} = \"{words(rng, 4)}\";" for i in range(lines))
+    return f"```\n{body}\n```"
+
+def make_page(rng, title, paragraphs=6, paragraph_words=80, links=10, code_lines=8, list_items=5):
+    blocks = [f"# {title}"]
+    for i in range(paragraphs):
+        blocks.append(inline_text(rng, paragraph_words, links // paragraphs + (i < links % paragraphs)))
+        if i == 0:
+            blocks.append("> " + words(rng, 12) + "\n> " + words(rng, 8))
+        if i == 1 and list_items:
+            blocks.append("\n".join(f"- {inline_text(rng, 6)}" for _ in range(list_items)))
+            blocks.append("\n".join(f"{n}. {words(rng, 5)}" for n in range(1, list_items + 1)))
+        if i == 2 and code_lines:
+            blocks.append(code_block(rng, code_lines))
+        if i == 3:
+            blocks.append(f"## {words(rng, 4)}")
+    return "\n\n".join(blocks) + "\n"
+
+def page_path(index, depth, fanout=10):
+    # spread pages over `depth` levels of `fanout` directories each
+    parts = []
+    rest = index
+    for _ in range(depth):
+        parts.append(f"d{rest % fanout}")
+        rest //= fanout
+    return os.path.join(*parts, f"page-{index:06d}.md") if parts else f"page-{index:06d}.md"
+
+def write_corpus(root, pages=100, depth=2, seed=0, **page_options):
+    # content/, static/ and template.html for a site of `pages` pages
+    rng = random.Random(seed)
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    os.makedirs(os.path.join(static, "images"), exist_ok=True)
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    with open(os.path.join(static, "index.css"), "w") as f:
+        f.write("body { font-family: serif; }\n" * 20)
+    for i in range(20):
+        with open(os.path.join(static, "images", f"image-{i}.png"), "wb") as f:
+            f.write(rng.randbytes(4096))
+    for i in range(pages):
+        path = os.path.join(content, page_path(i, depth))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(make_page(rng, f"Page {i} {words(rng, 3)}", **page_options))
+    return content, static, os.path.join(root, "template.html")
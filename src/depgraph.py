@@ -0,0 +1,79 @@
+RENDER = "render"
+LINK = "link"
+
+
+class DependencyGraph():
+    # What each page was built from, keyed by page source:
+    #   render  inputs whose content ends up in the page's output (its
+    #           source and the template); any change means re-rendering
+    #   link    site URLs the page points at (pages and static assets);
+    #           only their appearing or disappearing matters, and that
+    #           just means re-checking the page's links
+    # Saved in the manifest so the next build can ask which pages a
+    # change reaches instead of assuming all of them.
+
+    def __init__(self, edges=None):
+        self.edges = edges if edges is not None else {}
+        self._reverse = None
+
+    def __eq__(self, other):
+        if not isinstance(other, DependencyGraph):
+            return False
+        return self.edges == other.edges
+
+    def __repr__(self):
+        return f"DependencyGraph({len(self.edges)} pages)"
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __contains__(self, page):
+        return page in self.edges
+
+    def set(self, page, kind, dependencies):
+        self.edges.setdefault(page, {})[kind] = sorted(set(dependencies))
+        self._reverse = None
+
+    def remove(self, page):
+        if self.edges.pop(page, None) is not None:
+            self._reverse = None
+
+    def get(self, page, kind):
+        return self.edges.get(page, {}).get(kind, [])
+
+    def copy_from(self, other, page):
+        # an unchanged page keeps the edges recorded when it was rendered
+        if page in other.edges:
+            self.edges[page] = dict(other.edges[page])
+            self._reverse = None
+
+    def reverse(self, kind):
+        if self._reverse is None:
+            self._reverse = {}
+        if kind not in self._reverse:
+            index = {}
+            for page, kinds in self.edges.items():
+                for dependency in kinds.get(kind, ()):
+                    index.setdefault(dependency, []).append(page)
+            self._reverse[kind] = index
+        return self._reverse[kind]
+
+    def dependents(self, changed, kind):
+        # pages reached from the changed nodes over `kind` edges; a page
+        # can itself be a dependency (e.g. an include), so follow it through
+        index = self.reverse(kind)
+        found = set()
+        todo = list(changed)
+        while todo:
+            for page in index.get(todo.pop(), ()):
+                if page not in found:
+                    found.add(page)
+                    todo.append(page)
+        return found
+
+    def to_dict(self):
+        return self.edges
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({page: dict(kinds) for page, kinds in (data or {}).items()})
@@ -0,0 +1,96 @@
+import hashlib, json, posixpath
+from collections import OrderedDict
+
+from manifest import save_json
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class FragmentCache():
+    # Rendered HTML of single markdown blocks, keyed by a hash of the block
+    # text, its BlockType, the basepath links were resolved against and
+    # the asset map they were rewritten through, if any; with a map, a
+    # block with links also by the page directory relative ones are
+    # resolved in.
+    # Least recently used entries are evicted past max_entries. Entries
+    # put since the last take_added() are kept aside too, for a worker to
+    # send back to the process that saves the cache.
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.added = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"FragmentCache({len(self.entries)}/{self.max_entries}, {self.hits} hits, {self.misses} misses)"
+
+    @staticmethod
+    def key(block, block_type, basepath="/", assets=None):
+        h = hashlib.blake2b(block.encode(), digest_size=16)
+        if assets is not None:
+            scope = assets.digest
+            if assets.page is not None and "](" in block:
+                scope += ":" + posixpath.dirname(assets.page)
+            return f"{block_type.value}:{basepath}:{scope}:{h.hexdigest()}"
+        return f"{block_type.value}:{basepath}:{h.hexdigest()}"
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        if key not in self.entries:
+            self.added.append((key, html))
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def take_added(self):
+        added, self.added = self.added, []
+        return added
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        return (f"Fragment cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), "
+                f"{self.evictions} evictions, {len(self.entries)} entries")
+
+
+def load_fragment_cache(path, max_entries=DEFAULT_MAX_ENTRIES):
+    # like the manifest, a missing or unreadable file is just a cold cache
+    cache = FragmentCache(max_entries)
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return cache
+    # saved oldest first, so replaying keeps the LRU order
+    for key, html in entries:
+        cache.put(key, html)
+    cache.evictions = 0
+    cache.added = []
+    return cache
+
+def save_fragment_cache(cache, path):
+    save_json(list(cache.entries.items()), path)
@@ -1,7 +1,59 @@
 # python
+from collections.abc import Mapping
 from textnode import TextNode, TextType
 
+class EmptyProps(Mapping):
+    # read-only, so one node can't leak props into all of them, and
+    # pickled or deep-copied as a reference to the one shared instance
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __repr__(self):
+        return "EMPTY_PROPS"
+
+    def __reduce__(self):
+        return "EMPTY_PROPS"
+
+# shared by every node created without props/children, instead of a fresh
+# empty dict and list per node
+EMPTY_PROPS = EmptyProps()
+EMPTY_CHILDREN = ()
+
+# rendered ' name="value"' strings by (name, value) for str values:
+# link-dense pages repeat the same URLs, so each is escaped and formatted
+# once and the one string shared; cleared when full so a huge site can't
+# grow it forever. Other values aren't cached: 1, 1.0 and True are equal
+# keys that render differently, and a list can't be a key at all.
+ATTR_CACHE_SIZE = 1 << 14
+_attr_cache = {}
+
+def escape_attr(value):
+    # chained replace beats str.translate several times over on strings
+    # this short; "&" goes first so the entities aren't escaped again
+    return (str(value).replace("&", "&amp;").replace('"', "&quot;")
+            .replace("<", "&lt;").replace(">", "&gt;"))
+
+def attr_html(name, value):
+    key = (name, value)
+    html = _attr_cache.get(key)
+    if html is None:
+        html = f' {name}="{escape_attr(value)}"'
+        if len(_attr_cache) >= ATTR_CACHE_SIZE:
+            _attr_cache.clear()
+        _attr_cache[key] = html
+    return html
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -9,19 +61,42 @@ class HTMLNode:
         self.props = props if props is not None else {}
 
     def props_to_html(self):
-        if not self.props:
+        # values are double-quoted, so the quote and the characters that
+        # could start markup or an entity are escaped; the items of str
+        # values are already the cache's (name, value) keys
+        if self.props is EMPTY_PROPS:
             return ""
-        pairs = [f'{k}="{v}"' for k, v in self.props.items()]
-        return " " + " ".join(pairs)
+        html = ""
+        get = _attr_cache.get
+        for item in self.props.items():
+            if item[1].__class__ is str:
+                html += get(item) or attr_html(*item)
+            else:
+                html += f' {item[0]}="{escape_attr(item[1])}"'
+        return html
 
     def to_html(self):
         raise NotImplementedError("to_html must be implemented by subclasses")
 
+    def iter_html(self):
+        # chunks that join to to_html(); subclasses with children stream them
+        yield self.to_html()
+
+    def write_html(self, fp):
+        # serialize straight into a file-like object without building the
+        # whole document as one string
+        fp.writelines(self.iter_html())
+
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         # no children allowed; tag and value required (tag may be None)
-        super().__init__(tag=tag, value=value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = EMPTY_CHILDREN
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
         if self.value is None:
@@ -32,22 +107,63 @@ class LeafNode(HTMLNode):
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        # no children allowed; tag and value required (tag may be None)
-        super().__init__(tag=tag, value=None, children=children, props=props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
-        if self.tag is None:
-            raise ValueError("ParentNode must have a tag")
-        if self.children is None:
-            raise ValueError("ParentNode must have children")
-        inner = ""
-        for child in self.children:
-            inner = inner + child.to_html();
-        return f"<{self.tag}{self.props_to_html()}>{inner}</{self.tag}>"
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # explicit stack instead of recursion: output is produced in order,
+        # one tag or leaf at a time, and deep trees can't hit the
+        # recursion limit
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag is None:
+                    raise ValueError("ParentNode must have a tag")
+                if node.children is None:
+                    raise ValueError("ParentNode must have children")
+                yield f"<{node.tag}{node.props_to_html()}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield from node.iter_html()
 
 # python
-def text_node_to_html_node(text_node):
+def resolve_url(url, basepath="/", assets=None):
+    # site-root URLs ("/images/x.png") are served from under basepath, and
+    # under their fingerprinted name when assets (an AssetMap) has one
+    if assets is not None and url:
+        url = assets.resolve(url)
+    if basepath != "/" and url and url.startswith("/"):
+        return basepath + url[1:]
+    return url
+
+def image_props(url, basepath="/", assets=None):
+    # for a static image the build measured: width and height so the page
+    # doesn't shift as it loads, and any resized variants as a srcset the
+    # browser picks from, for an image shown no wider than it is
+    image = assets.image(url) if assets is not None else None
+    if image is None:
+        return {}
+    props = {}
+    if len(image["srcset"]) > 1:
+        props["srcset"] = ", ".join(f"{resolve_url(src, basepath)} {width}w" for src, width in image["srcset"])
+        props["sizes"] = f"(max-width: {image['width']}px) 100vw, {image['width']}px"
+    props["width"] = str(image["width"])
+    props["height"] = str(image["height"])
+    return props
+
+def text_node_to_html_node(text_node, basepath="/", assets=None):
     t = text_node.text_type
     match t:
         case TextType.TEXT:
@@ -59,8 +175,10 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode("code", text_node.text)
         case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return LeafNode("a", text_node.text, {"href": resolve_url(text_node.url, basepath, assets)})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+            props = {"src": resolve_url(text_node.url, basepath, assets), "alt": text_node.text}
+            props.update(image_props(text_node.url, basepath, assets))
+            return LeafNode("img", "", props)
         case _:
             raise Exception("unsupported TextType")
\ No newline at end of file
@@ -0,0 +1,201 @@
+import contextlib, os, posixpath, struct
+from concurrent.futures import ProcessPoolExecutor
+
+import png
+from manifest import hash_file
+from pageio import write_bytes
+from sync import SyncResult, copy_file, is_synced, scan_files, stamp
+
+# optional: with Pillow any format it reads is resized (with a better
+# filter); without it only PNGs are, by the pure-Python codec
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# widths of the resized variants; only those narrower than the source are made
+DERIVATIVE_WIDTHS = (480, 960, 1440)
+IMAGE_FORMATS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+# gifs may be animated, and resizing would keep only the first frame
+PILLOW_RESIZABLE = {".png", ".jpg", ".jpeg", ".webp"}
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def jpeg_size(f):
+    # from the first SOFn frame header, skipping the segments (EXIF,
+    # thumbnails) before it rather than reading them
+    if f.read(2) != b"\xff\xd8":
+        raise Exception("not a JPEG file")
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            break
+        marker = byte[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">3xHH", f.read(7))
+            return width, height
+        if marker in (0xD9, 0xDA):
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        length, = struct.unpack(">H", f.read(2))
+        f.seek(length - 2, os.SEEK_CUR)
+    raise Exception("no JPEG frame header")
+
+def gif_size(f):
+    # the logical screen descriptor right after the signature
+    head = f.read(10)
+    if head[:6] not in (b"GIF87a", b"GIF89a"):
+        raise Exception("not a GIF file")
+    return struct.unpack("<HH", head[6:10])
+
+def webp_size(f):
+    # from the header of the first chunk: lossy (VP8), lossless (VP8L) or
+    # extended (VP8X, which holds the canvas size)
+    head = f.read(30)
+    if len(head) < 30 or head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        raise Exception("not a WebP file")
+    kind = head[12:16]
+    if kind == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if kind == b"VP8L" and head[20] == 0x2F:
+        bits, = struct.unpack("<I", head[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if kind == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    raise Exception(f"unsupported WebP chunk {kind}")
+
+# what the size of each format is read with when Pillow isn't there;
+# those images get width and height but no resized variants
+HEADER_READERS = {".jpg": jpeg_size, ".jpeg": jpeg_size, ".gif": gif_size, ".webp": webp_size}
+
+def image_size(path):
+    # (width, height, whether it can be resized) or None if unreadable
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if Image is not None:
+            with Image.open(path) as image:
+                return image.width, image.height, ext in PILLOW_RESIZABLE
+        if ext == ".png":
+            header = png.read_header(path)
+            return header.width, header.height, header.supported
+        if ext in HEADER_READERS:
+            with open(path, "rb") as f:
+                width, height = HEADER_READERS[ext](f)
+            return width, height, False
+    except Exception:
+        pass
+    return None
+
+def derivative_url(url, width):
+    # /images/a.png -> /images/a-480w.png
+    root, ext = posixpath.splitext(url)
+    return f"{root}-{width}w{ext}"
+
+def scan_images(static_dir, old=None, assets=None):
+    # Every static image as url -> {"size", "mtime", "hash", "width",
+    # "height", "widths", "srcset"}: widths are the variants made of it,
+    # and srcset the [url, width] of each variant and then the original,
+    # as served (fingerprinted, when assets maps it). Files whose size
+    # and mtime match their entry in old aren't hashed or measured again.
+    old = old or {}
+    entries = {}
+    for rel, stat in sorted(scan_files(static_dir).items()):
+        url = "/" + rel.replace(os.sep, "/")
+        if posixpath.splitext(url)[1].lower() not in IMAGE_FORMATS:
+            continue
+        entry = stamp(stat)
+        previous = old.get(url, {})
+        if "hash" in previous and all(previous.get(key) == value for key, value in entry.items()):
+            for key in ("hash", "width", "height", "widths"):
+                entry[key] = previous[key]
+        else:
+            path = os.path.join(static_dir, rel)
+            size = image_size(path)
+            if size is None:
+                continue
+            width, height, resizable = size
+            entry["hash"] = hash_file(path)
+            entry["width"], entry["height"] = width, height
+            entry["widths"] = [w for w in DERIVATIVE_WIDTHS if w < width] if resizable else []
+        served = assets.resolve(url) if assets is not None else url
+        entry["srcset"] = [[derivative_url(served, w), w] for w in entry["widths"]] + [[served, entry["width"]]]
+        entries[url] = entry
+    return entries
+
+def changed_images(old, new):
+    # URLs whose <img> attributes differ between two scans, including
+    # images that appeared or disappeared
+    old, new = old or {}, new or {}
+    def rendered(entry):
+        return entry and (entry["width"], entry["height"], entry["srcset"])
+    return sorted(url for url in old.keys() | new.keys() if rendered(old.get(url)) != rendered(new.get(url)))
+
+def variants(url, entry, cache_dir):
+    # (cached file, width, height, served url) of each resized variant;
+    # cached by source hash and width, so a variant is never made twice
+    ext = posixpath.splitext(url)[1].lower()
+    for served, width in entry["srcset"][:-1]:
+        height = max(1, round(entry["height"] * width / entry["width"]))
+        yield os.path.join(cache_dir, f"{entry['hash']}-{width}w{ext}"), width, height, served
+
+def make_variants(src, targets):
+    # runs in a worker: decodes src once and writes each (path, width,
+    # height) of targets
+    if Image is not None:
+        with Image.open(src) as image:
+            for path, width, height in targets:
+                tmp = f"{path}.{os.getpid()}.tmp"
+                try:
+                    image.resize((width, height), Image.LANCZOS).save(tmp, format=image.format)
+                    os.replace(tmp, path)
+                finally:
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp)
+        return len(targets)
+    with open(src, "rb") as f:
+        image = png.decode(f.read())
+    for path, width, height in targets:
+        write_bytes(path, png.encode(png.resize(image, width, height)))
+    return len(targets)
+
+def sync_derivatives(entries, static_dir, docs_dir, cache_dir, select=None, link=False, workers=DEFAULT_WORKERS):
+    # Makes the variants missing from cache_dir, across processes, and
+    # syncs each into docs_dir next to its original. Returns the sync
+    # result, with entries keyed "<source>@<width>w" for the manifest's
+    # static section, and how many variants were made.
+    os.makedirs(cache_dir, exist_ok=True)
+    result = SyncResult()
+    jobs = []
+    copies = []
+    for url, entry in entries.items():
+        rel = url[1:].replace("/", os.sep)
+        if select is not None and not select(rel):
+            continue
+        src = os.path.join(static_dir, rel)
+        missing = []
+        for path, width, height, served in variants(url, entry, cache_dir):
+            if not os.path.exists(path):
+                missing.append((path, width, height))
+            copies.append((f"{src}@{width}w", path, os.path.join(docs_dir, served[1:].replace("/", os.sep))))
+        if missing:
+            jobs.append((src, missing))
+    if len(jobs) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            made = sum(pool.map(make_variants, *zip(*jobs)))
+    else:
+        made = sum(make_variants(src, targets) for src, targets in jobs)
+    for key, path, output in copies:
+        path_stat = os.stat(path)
+        result.entries[key] = dict(stamp(path_stat), output=output)
+        if is_synced(path, path_stat, output):
+            result.skipped += 1
+        else:
+            copy_file(path, output, link=link)
+            result.copied.append(output)
+    return result, made
@@ -0,0 +1,140 @@
+import os, posixpath
+from textnode import INLINE_LINK_RE
+from depgraph import LINK
+
+# schemes and prefixes that point off-site; only site paths are checked
+EXTERNAL_PREFIXES = ("//", "http:", "https:", "mailto:", "tel:", "data:", "javascript:")
+
+
+def scan_links(lines, found):
+    # Passes lines through unchanged while appending (line number, url) to
+    # found for every link and image outside ``` fences. Lines are grouped
+    # into runs between blank lines so a link wrapped over two lines of a
+    # paragraph is still found, and only one run is held at a time.
+    run = []
+    run_start = 0
+    in_code = False
+    for number, line in enumerate(lines, start=1):
+        yield line
+        stripped = line.strip()
+        if stripped == "```" or stripped == "" or in_code:
+            if run:
+                _find_in_run(run, run_start, found)
+                run = []
+            if stripped == "```":
+                in_code = not in_code
+            continue
+        if not run:
+            run_start = number
+        run.append(line.rstrip("\n"))
+    if run:
+        _find_in_run(run, run_start, found)
+
+def _find_in_run(run, run_start, found):
+    text = "\n".join(run)
+    line, pos = run_start, 0
+    for match in INLINE_LINK_RE.finditer(text):
+        line += text.count("\n", pos, match.start())
+        pos = match.start()
+        url = match.group(2) if match.group(2) is not None else match.group(4)
+        found.append((line, url))
+
+def find_links(lines):
+    found = []
+    for _ in scan_links(lines, found):
+        pass
+    return found
+
+def output_url(path, docs_dir):
+    return "/" + os.path.relpath(path, docs_dir).replace(os.sep, "/")
+
+def page_url(path, docs_dir):
+    # the URL a page is linked as: its directory for index.html
+    url = output_url(path, docs_dir)
+    if url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+    return url
+
+
+class LinkIndex():
+    # Every URL path the built site answers: each output file, plus the
+    # directory and extensionless forms a static host serves for pages.
+
+    def __init__(self):
+        self.urls = set()
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    @staticmethod
+    def forms(url):
+        yield url
+        if url.endswith("/index.html"):
+            directory = url[:-len("index.html")]
+            yield directory
+            if directory != "/":
+                yield directory[:-1]
+        elif url.endswith(".html"):
+            yield url[:-len(".html")]
+
+    def add(self, url):
+        self.urls.update(self.forms(url))
+
+    def add_outputs(self, paths, docs_dir):
+        for path in paths:
+            self.add(output_url(path, docs_dir))
+
+    def resolve(self, url, page_url="/"):
+        # site path a link points at, or None for off-site/in-page links
+        url = url.strip()
+        if not url or url.startswith("#") or url.lower().startswith(EXTERNAL_PREFIXES):
+            return None
+        url = url.split("#", 1)[0].split("?", 1)[0]
+        if not url.startswith("/"):
+            url = posixpath.join(posixpath.dirname(page_url), url)
+        target = posixpath.normpath(url)
+        if url.endswith("/") and target != "/":
+            target += "/"
+        return target
+
+    def targets(self, links, page_url="/"):
+        # the site paths a page depends on for its links to be valid
+        for line, url in links:
+            target = self.resolve(url, page_url)
+            if target is not None:
+                yield target
+
+    def dangling(self, links, page_url="/"):
+        for line, url in links:
+            target = self.resolve(url, page_url)
+            if target is not None and target not in self.urls:
+                yield line, url
+
+
+def check_links(pages, outputs, docs_dir, deps=None, assets=None):
+    # pages: manifest page entries with "output" and "links"; outputs: every
+    # entry (static and pages) whose "output" the site serves; deps: a
+    # DependencyGraph to record each checked page's link targets in;
+    # assets: the AssetMap pages were rendered through, so each link is
+    # checked as the URL it was rewritten to (a fingerprinted asset's own
+    # name isn't served)
+    index = LinkIndex()
+    index.add_outputs((entry["output"] for entry in outputs), docs_dir)
+    broken = []
+    for src, entry in sorted(pages.items()):
+        page_url = output_url(entry["output"], docs_dir)
+        links = entry.get("links", [])
+        served = links
+        if assets is not None:
+            resolve = assets.at(page_url).resolve
+            served = [(line, resolve(url)) for line, url in links]
+        if deps is not None:
+            deps.set(src, LINK, index.targets(served, page_url))
+        for (line, url), (_, served_url) in zip(links, served):
+            target = index.resolve(served_url, page_url)
+            if target is not None and target not in index:
+                broken.append((src, line, url))
+    return broken
@@ -1,21 +1,105 @@
-import shutil,os, sys
-from markdown_blocks import markdown_to_html_node
+import os, sys, argparse, asyncio, contextlib, io, itertools, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from markdown_blocks import iter_markdown_html, iter_typed_blocks, markdown_to_html_node
+from template import load_template
+from manifest import Manifest, hash_file, load_manifest, save_manifest
+from compress import compress_outputs, siblings
+from assets import AssetMap, asset_renames, asset_urls, changed_assets, fingerprint_assets
+from images import changed_images, scan_images, sync_derivatives
+from sync import prune_tree, sync_tree
+from profiler import BuildProfile, instrument, profile_page, stage, timed_iter
+from links import LinkIndex, check_links, find_links, output_url, page_url, scan_links
+from metadata import SiteIndex, has_front_matter, read_metadata, strip_front_matter
+from depgraph import LINK, RENDER
+from search import SearchIndex, count_terms, load_search_terms, save_search_terms, scan_terms
+from pageio import Capture, Writer, iter_lines, read_text, write_bytes
+from pipeline import Pipeline, Stage
+from shard import in_shard, merge_shards, parse_shard, shard_paths
+from fragment_cache import DEFAULT_MAX_ENTRIES, load_fragment_cache, save_fragment_cache
 
 path_public = './public'
 path_static = './static'
 path_docs = './docs'
+path_content = './content'
+path_template = './template.html'
+path_manifest = './.build/manifest.json'
+path_fragments = './.build/fragments.json'
+path_search_terms = './.build/search-terms.json'
+path_shards = './.build/shards'
+path_images = './.build/images'
 
-def copy_recursive(src, dst):
-    contents = os.listdir(src)
-    for content in contents:
-        if os.path.isfile(src + "/" + content):
-            shutil.copy(src + "/" + content, dst)
-        else:
-            os.makedirs(dst + "/" + content, exist_ok=True)
-            copy_recursive(src + "/" + content, dst + "/" + content)
+# sources at least this big are parsed and rendered block by block
+# straight from the file instead of being read into memory whole
+STREAM_THRESHOLD = 8 * 1024 * 1024
+# pages rendered between waits for their writes when building serially
+BATCH_SIZE = 64
+# reads and writes in flight at once in the pipelined build
+IO_THREADS = 8
+
+# per-process build state: set by build() for serial runs and by
+# init_worker in each pool process
+_fragment_cache = None
+_profiling = False
+_search = False
+_writer = None
+_assets = None
+
+def remove_output(path, docs_dir):
+    if os.path.exists(path):
+        os.remove(path)
+    # prune directories the removed file leaves empty, but never docs itself
+    parent = os.path.dirname(path)
+    while os.path.abspath(parent) != os.path.abspath(docs_dir) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def page_output_path(src_md, content_dir, docs_dir):
+    rel = os.path.relpath(src_md, content_dir)
+    out_dir = os.path.join(docs_dir, os.path.dirname(rel))
+    base = os.path.basename(src_md)
+    if base == "index.md":
+        return os.path.join(out_dir, "index.html")
+    return os.path.join(out_dir, os.path.splitext(base)[0] + ".html")
+
+def find_pages(content_dir, docs_dir):
+    pages = []
+    for dirpath, dirnames, filenames in os.walk(content_dir):
+        for name in filenames:
+            if not name.endswith(".md"):
+                continue
+            src_md = os.path.join(dirpath, name)
+            pages.append((src_md, page_output_path(src_md, content_dir, docs_dir)))
+    return sorted(pages)
+
+def page_metadata(src_md, entry, cached):
+    # title and front matter, re-read from the head of the file only when
+    # its hash differs from the cached entry's
+    old = cached.get(src_md)
+    if old is not None and old.get("hash") == entry["hash"] and "meta" in old:
+        return old["meta"]
+    try:
+        return read_metadata(src_md)
+    except (OSError, UnicodeDecodeError):
+        return {}
+
+def scan_site(content_dir=path_content, docs_dir=path_docs, manifest_path=path_manifest):
+    # the metadata pass on its own: a SiteIndex of the current sources
+    # without rendering anything, reusing the last build's metadata
+    cached = load_manifest(manifest_path).pages
+    pages = {}
+    for src_md, out_html in find_pages(content_dir, docs_dir):
+        entry = {"hash": hash_file(src_md), "output": out_html}
+        entry["meta"] = page_metadata(src_md, entry, cached)
+        pages[src_md] = entry
+    return site_index(pages, docs_dir)
+
+def site_index(pages, docs_dir):
+    return SiteIndex([dict(entry.get("meta", {}), src=src_md, url=page_url(entry["output"], docs_dir))
+                      for src_md, entry in pages.items()])
 
 def extract_title(markdown):
-    split_result = markdown.split("\n\n")
+    split_result = markdown.split("\n\n", 1)
     heading_count = len(split_result[0])-len(split_result[0].lstrip('#'))
     heading_content = ""
     if heading_count == 0:
@@ -24,51 +108,595 @@ def extract_title(markdown):
         heading_content = split_result[0][heading_count:].strip()
     return heading_content
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
+def stream_page(from_path, template_path, dest_path, basepath="/", cache=None, search=False, writer=None,
+                assets=None, url=None):
+    # memory stays flat whatever the size of the source: lines are decoded
+    # lazily from a mapping and each block is written out as soon as it
+    # is rendered
+    template = load_template(template_path, basepath, assets)
+    print("Streaming:", from_path)
+    links = []
+    terms = Counter() if search else None
+    meta = {}
+    lines = strip_front_matter(scan_links(iter_lines(from_path), links), meta)
+    if search:
+        lines = scan_terms(lines, terms)
+    blocks = iter_typed_blocks(lines)
+    first = next(blocks, None)
+    title = meta.get("title") or extract_title(first.text if first else "")
+    content = iter_markdown_html(itertools.chain([first], blocks), basepath, cache, page_assets(assets, url))
+    with stage("write"), (writer or Writer(0)).stream(dest_path) as file:
+        file.writelines(template.iter_render({"Title": title, "Content": content}))
+    return {"title": title, "links": links, "terms": terms, "size": os.path.getsize(dest_path)}
+
+def generate_page(from_path, template_path, dest_path, basepath="/", cache=None, search=False, writer=None,
+                  markdown=None, assets=None, url=None):
+    # returns what the rest of the build needs to know about the page: its
+    # title, the (line, url) of every link and image, its size and with
+    # search the count of every word on it. With a writer the output may
+    # still be in flight until writer.flush(). markdown is the source
+    # text when the caller has already read it; assets is the AssetMap
+    # that URLs are rewritten through when fingerprinting, and url the
+    # page's output URL, which relative ones are resolved against.
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    markdown_result = ""
-    template_result = ""
-    with open(from_path) as f:
-        markdown_result = f.read()
-    with open(template_path) as f:
-        template_result = f.read()
+    if markdown is None and os.path.getsize(from_path) >= STREAM_THRESHOLD:
+        return stream_page(from_path, template_path, dest_path, basepath, cache, search, writer, assets, url)
+    source = markdown
+    if source is None:
+        with stage("read"):
+            source = read_text(from_path)
+    meta = {}
+    markdown_result = source
+    if has_front_matter(source):
+        markdown_result = "\n".join(strip_front_matter(source.split("\n"), meta))
+    with stage("template"):
+        template = load_template(template_path, basepath, assets)
     print("Parsing:", from_path)
-    markdown_html = markdown_to_html_node(markdown_result).to_html()
-    title = extract_title(markdown_result)
-    update_title = template_result.replace("{{ Title }}", title)
-    update_html = update_title.replace("{{ Content }}", markdown_html)
-    update_href = update_html.replace('href="/', f'href="{basepath}')
-    update_src = update_href.replace('src="/', f'src="{basepath}')
-    with open(dest_path, "w") as file:
-        file.write(update_src)
-
-def main():
-
-    basepath = "/"
-    if sys.argv[1:]:
-        print(f"{sys.argv}")
-        basepath = sys.argv[1]
-        print("------------------------------------------------")
-        print(f"User prompt: {basepath}")
+    with stage("markdown_to_html_node"):
+        markdown_node = markdown_to_html_node(markdown_result, basepath, cache, page_assets(assets, url))
+    title = meta.get("title") or extract_title(markdown_result)
+    with stage("write"):
+        content = timed_iter("to_html", markdown_node.iter_html())
+        data = "".join(template.iter_render({"Title": title, "Content": content})).encode("utf-8")
+        (writer or Writer(0)).write(dest_path, data)
+    # link line numbers count from the top of the file, front matter included
+    return {"title": title, "links": find_links(source.splitlines()),
+            "terms": count_terms(markdown_result.splitlines()) if search else None, "size": len(data)}
 
+def page_assets(assets, url):
+    # the template is shared by pages at every depth, so only the page's
+    # own markdown resolves relative URLs
+    if assets is None or url is None:
+        return assets
+    return assets.at(url)
 
-    if os.path.exists(path_docs):
-        shutil.rmtree(path_docs)
-    os.mkdir(path_docs, mode=0o777, dir_fd=None)
-    copy_recursive(path_static, path_docs)
-    for dirpath, dirnames, filenames in os.walk("./content"):
-        for name in filenames:
-            if not name.endswith(".md"):
-                continue
-            src_md = os.path.join(dirpath, name)
-            rel = os.path.relpath(src_md, "content")
-            out_dir = os.path.join("docs", os.path.dirname(rel))  
-            os.makedirs(out_dir, exist_ok=True)
-            base = os.path.basename(src_md)
-            if base == "index.md":
-                out_html = os.path.join(out_dir, "index.html")
+def init_worker(cache_path, cache_size, profile, search, assets):
+    global _assets, _fragment_cache, _profiling, _search, _writer
+    _search = search
+    _assets = assets
+    _writer = Writer()
+    if cache_path is not None:
+        _fragment_cache = load_fragment_cache(cache_path, cache_size)
+    if profile:
+        _profiling = True
+        instrument()
+
+class RenderResult():
+    # what a worker sends back for one page
+    __slots__ = ("src", "out", "log", "error", "page", "data", "written", "hits", "misses", "fragments", "profile")
+
+    def __init__(self, src, out):
+        self.src = src
+        self.out = out
+        self.log = ""
+        self.error = None
+        self.page = None
+        self.data = None
+        self.written = False
+        self.hits = 0
+        self.misses = 0
+        self.fragments = []
+        self.profile = None
+
+    def __repr__(self):
+        return f"RenderResult({self.src}, {self.error})"
+
+def render_job(job, markdown=None):
+    # runs in a worker: capture the page's log so the parent can print it
+    # in a stable order, and turn a failure into a per-page error. Given
+    # the source text, the output bytes come back in result.data instead
+    # of being written.
+    src_md, template_path, out_html, basepath, url = job
+    result = RenderResult(src_md, out_html)
+    cache = _fragment_cache
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), contextlib.ExitStack() as stack:
+        if _profiling:
+            result.profile = stack.enter_context(profile_page(src_md))
+        try:
+            os.makedirs(os.path.dirname(out_html), exist_ok=True)
+            capture = Capture() if markdown is not None else None
+            result.page = generate_page(src_md, template_path, out_html, basepath, cache, _search,
+                                        capture or _writer, markdown, _assets, url)
+            if capture is not None:
+                result.data = capture.data
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+    result.log = log.getvalue()
+    if result.profile is not None and result.error is None:
+        result.profile.bytes_in = os.path.getsize(src_md)
+        result.profile.bytes_out = result.page["size"]
+    if cache:
+        result.hits, result.misses = cache.hits - hits, cache.misses - misses
+        result.fragments = cache.take_added()
+    return result
+
+def failed_result(job, e):
+    result = RenderResult(job[0], job[2])
+    result.error = f"{type(e).__name__}: {e}"
+    return result
+
+def batch_results(jobs, future):
+    # a batch's results, or an error for each of its pages if the worker
+    # rendering it died (which breaks the pool for the batches after it)
+    try:
+        return future.result()
+    except Exception as e:
+        return [failed_result(job, e) for job in jobs]
+
+def render_batch(jobs):
+    # renders a batch of pages, then waits for their outputs to land so a
+    # failed write is reported against its page
+    results = [render_job(job) for job in jobs]
+    outcomes = _writer.flush() if _writer is not None else {}
+    for result in results:
+        outcome = outcomes.get(result.out)
+        if isinstance(outcome, Exception):
+            result.error = f"{type(outcome).__name__}: {outcome}"
+        elif result.error is None:
+            result.written = outcome is not False
+    return results
+
+def pipeline_pages(jobs, workers, depth, initargs):
+    # walk -> read -> render -> write over bounded queues: reads and writes
+    # run on I/O threads while pages render in the executor, so slow disks
+    # (NFS in CI) overlap with CPU work instead of stalling it
+    results = [None] * len(jobs)
+    with contextlib.ExitStack() as stack:
+        io_pool = stack.enter_context(ThreadPoolExecutor(IO_THREADS))
+        if workers > 1:
+            render_pool = stack.enter_context(ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker, initargs=initargs))
+        else:
+            render_pool = stack.enter_context(ThreadPoolExecutor(1))
+
+        async def read(item):
+            i, job = item
+            try:
+                # huge sources are streamed by the renderer itself
+                markdown = None
+                if os.path.getsize(job[0]) < STREAM_THRESHOLD:
+                    markdown = await asyncio.get_running_loop().run_in_executor(io_pool, read_text, job[0])
+            except Exception as e:
+                results[i] = failed_result(job, e)
+                return None
+            return i, job, markdown
+
+        async def render(item):
+            i, job, markdown = item
+            loop = asyncio.get_running_loop()
+            try:
+                if markdown is None:
+                    # streamed straight to its output by the renderer,
+                    # whose writer says whether the file changed
+                    result = (await loop.run_in_executor(render_pool, render_batch, [job]))[0]
+                else:
+                    result = await loop.run_in_executor(render_pool, render_job, job, markdown)
+            except Exception as e:
+                # the pool itself failed (a worker died, the job wouldn't
+                # pickle): still a per-page error
+                result = failed_result(job, e)
+            results[i] = result
+            return result if result.data is not None else None
+
+        async def write(result):
+            try:
+                result.written = await asyncio.get_running_loop().run_in_executor(
+                    io_pool, write_bytes, result.out, result.data)
+            except OSError as e:
+                result.error = f"{type(e).__name__}: {e}"
+            result.data = None
+
+        Pipeline([
+            Stage("read", read, IO_THREADS),
+            Stage("render", render, workers),
+            Stage("write", write, IO_THREADS),
+        ], depth).run_sync(enumerate(jobs))
+    return results
+
+def render_pages(jobs, workers=1, cache_path=None, cache_size=DEFAULT_MAX_ENTRIES, profile=None, search=False,
+                 queue_depth=None, assets=None):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    errors = {}
+    pages = {}
+    hits = misses = unchanged = 0
+    # each worker starts from the saved fragment cache and sends back the
+    # fragments it rendered, which go into the parent's cache to be saved
+    initargs = (cache_path, cache_size, profile is not None, search, assets)
+    with contextlib.ExitStack() as stack:
+        if queue_depth:
+            results = pipeline_pages(jobs, workers, queue_depth, initargs)
+        elif workers > 1 and len(jobs) > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker, initargs=initargs))
+            size = max(1, len(jobs) // (workers * 4))
+            chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+            futures = [pool.submit(render_batch, chunk) for chunk in chunks]
+            results = itertools.chain.from_iterable(map(batch_results, chunks, futures))
+        else:
+            batches = (render_batch(jobs[i:i + BATCH_SIZE]) for i in range(0, len(jobs), BATCH_SIZE))
+            results = itertools.chain.from_iterable(batches)
+        # results come in submission order, so output never interleaves
+        for result in results:
+            print(result.log, end="")
+            if result.error is not None:
+                print(f"Error generating {result.src}: {result.error}")
+                errors[result.src] = result.error
             else:
-                out_html = os.path.join(out_dir, os.path.splitext(base)[0] + ".html")
-            generate_page(src_md, "./template.html", out_html, basepath)
+                pages[result.src] = result.page
+                unchanged += not result.written
+            hits += result.hits
+            misses += result.misses
+            if _fragment_cache is not None:
+                for key, html in result.fragments:
+                    _fragment_cache.put(key, html)
+            if result.profile is not None and profile is not None:
+                profile.add(result.profile)
+    if unchanged:
+        print(f"{unchanged} pages rendered identical to their output, left untouched")
+    return errors, pages, hits, misses
+
+def build(basepath="/", incremental=False, jobs=1, content_dir=path_content, static_dir=path_static,
+          docs_dir=path_docs, template_path=path_template, manifest_path=path_manifest,
+          fragment_cache_path=None, fragment_cache_size=DEFAULT_MAX_ENTRIES, link=False, profile=None,
+          strict_links=False, search_terms_path=None, queue_depth=None, shard=None, compress=False,
+          fingerprint=False, image_cache_dir=None):
+    # shard=(i, N) builds only the sources that hash into shard i; links
+    # are left for the merge to check, since they can point anywhere.
+    # fingerprint=True serves static assets under content-hashed names
+    # and points every page at them. With image_cache_dir, static images
+    # get resized variants (made once, kept there) and every <img> of
+    # one a srcset, sizes, width and height.
+    global _assets, _fragment_cache, _profiling, _search, _writer
+    if shard is not None and search_terms_path is not None:
+        raise Exception("search needs an unsharded build")
+    if shard is not None and (strict_links or compress):
+        raise Exception("link checking and compression happen when shards are merged, not per shard")
+    select = (lambda rel: in_shard(rel, shard)) if shard is not None else None
+    old = load_manifest(manifest_path) if incremental else Manifest()
+    os.makedirs(docs_dir, exist_ok=True)
+
+    new = Manifest(basepath, hash_file(template_path))
+    assets = None
+    if fingerprint:
+        # every shard maps every asset, since any page may use any of them;
+        # only files whose size or mtime changed are rehashed
+        new.assets = fingerprint_assets(static_dir, old.assets)
+    if image_cache_dir is not None:
+        # measured in full by every shard too; unchanged files keep their
+        # hash and size from the last build
+        new.images = scan_images(static_dir, old.images, AssetMap.from_entries(new.assets))
+    if new.assets is not None or new.images is not None:
+        assets = AssetMap.from_entries(new.assets, new.images)
+    cached = old.pages
+    old_outputs = {e["output"] for e in list(old.static.values()) + list(old.pages.values())}
+    # every page embeds the basepath, and whether its asset URLs are
+    # fingerprinted and its images responsive
+    if (old.basepath != new.basepath or (old.assets is None) != (new.assets is None) or
+            (old.images is None) != (new.images is None)):
+        old.pages = {}
+    elif old.template != new.template:
+        # and the template it was rendered with: drop the pages the graph
+        # says were built from it, and any the graph has no record of
+        rendered_with = old.deps.dependents([template_path], RENDER)
+        old.pages = {src: e for src, e in old.pages.items() if src in old.deps and src not in rendered_with}
+    if assets is not None:
+        # and the fingerprinted names and image sizes of the assets it (or
+        # its template) links to
+        changed = changed_assets(old.assets, new.assets) + changed_images(old.images, new.images)
+        renamed = old.deps.dependents(changed, RENDER)
+        old.pages = {src: e for src, e in old.pages.items() if src not in renamed}
+        new.deps.set(template_path, RENDER, asset_urls(load_template(template_path, basepath, assets).urls))
+
+    # static files are synced by size and mtime in both modes, so a full
+    # build no longer recopies unchanged assets
+    synced = sync_tree(static_dir, docs_dir, link=link, select=select,
+                       rename=asset_renames(new.assets) if fingerprint else None)
+    new.static = synced.entries
+    if synced.copied:
+        print(f"Copied {len(synced.copied)} static files ({synced.skipped} unchanged)")
+    if image_cache_dir is not None:
+        derived, made = sync_derivatives(new.images, static_dir, docs_dir, image_cache_dir, select, link)
+        new.static.update(derived.entries)
+        if derived.copied:
+            print(f"Resized images: {made} variants made, {len(derived.copied)} copied "
+                  f"({derived.skipped} unchanged)")
+
+    pending = []
+    for src_md, out_html in find_pages(content_dir, docs_dir):
+        if select is not None and not select(os.path.relpath(src_md, content_dir)):
+            continue
+        entry = {"hash": hash_file(src_md), "output": out_html}
+        new.pages[src_md] = entry
+        is_current = old.is_current("pages", src_md, entry)
+        entry["meta"] = page_metadata(src_md, entry, cached)
+        if is_current:
+            # unchanged pages keep the links found when they were rendered,
+            # the result of checking them and their dependency edges
+            for key in ("links", "broken"):
+                if key in old.pages[src_md]:
+                    entry[key] = old.pages[src_md][key]
+            new.deps.copy_from(old.deps, src_md)
+        else:
+            pending.append((src_md, template_path, out_html, basepath, output_url(out_html, docs_dir)))
+    if fragment_cache_path is not None:
+        _fragment_cache = load_fragment_cache(fragment_cache_path, fragment_cache_size)
+    if profile is not None:
+        _profiling = True
+        instrument()
+    search = search_terms_path is not None
+    _search = search
+    _assets = assets
+    _writer = Writer()
+    started = time.perf_counter_ns()
+    try:
+        errors, pages, hits, misses = render_pages(pending, jobs, fragment_cache_path, fragment_cache_size,
+                                                   profile, search, queue_depth, assets)
+    finally:
+        cache, _fragment_cache = _fragment_cache, None
+        _writer.close()
+        _profiling = _search = False
+        _writer = _assets = None
+    if profile is not None:
+        profile.wall_ns = time.perf_counter_ns() - started
+    if cache is not None:
+        cache.hits, cache.misses = hits, misses
+        print(cache.summary())
+        save_fragment_cache(cache, fragment_cache_path)
+    for src_md in errors:
+        # keep the entry so its output isn't treated as stale, but make
+        # sure the next incremental build retries it
+        new.pages[src_md]["hash"] = None
+    for src_md, page in pages.items():
+        new.pages[src_md]["links"] = page["links"]
+        rendered_from = [src_md, template_path]
+        if assets is not None:
+            rendered_from += asset_urls((url for line, url in page["links"]),
+                                        output_url(new.pages[src_md]["output"], docs_dir))
+        new.deps.set(src_md, RENDER, rendered_from)
+
+    # links are re-checked on re-rendered pages and on pages pointing at a
+    # URL that appeared or disappeared; the rest keep last build's result
+    outputs = {e["output"] for e in list(new.static.values()) + list(new.pages.values())}
+    broken = []
+    if shard is None:
+        changed_urls = set()
+        for path in outputs ^ old_outputs:
+            changed_urls.update(LinkIndex.forms(output_url(path, docs_dir)))
+        changed_urls.update(set(old.assets or ()) ^ set(new.assets or ()))
+        recheck = new.deps.dependents(changed_urls, LINK)
+        recheck.update(src_md for src_md, entry in new.pages.items() if "broken" not in entry)
+        broken = check_site_links(new, recheck, docs_dir)
+    else:
+        print(f"Shard {shard[0]}/{shard[1]}: {len(new.pages)} pages, {len(new.static)} static files")
+
+    if search:
+        outputs.update(write_search_index(new, pages, docs_dir, search_terms_path))
+    if compress:
+        # a full build still reuses siblings of outputs it left untouched
+        previous = old if incremental else load_manifest(manifest_path)
+        new.compressed = compress_site(outputs, previous.compressed)
+    outputs.update(remove_stale_siblings(old.compressed, new.compressed, docs_dir))
+    if incremental:
+        for section in ("static", "pages"):
+            for stale in old.stale_outputs(section, getattr(new, section)):
+                if stale in outputs:
+                    continue
+                print(f"Removing {stale}")
+                remove_output(stale, docs_dir)
+    else:
+        # a full build owns docs/: anything it didn't produce goes
+        for stale in prune_tree(docs_dir, outputs):
+            print(f"Removing {stale}")
+    save_manifest(new, manifest_path)
+    if errors:
+        raise Exception(f"{len(errors)} of {len(pending)} pages failed to build")
+    if broken and strict_links:
+        raise Exception(f"{len(broken)} broken links")
+    return new
+
+def compress_site(outputs, previous):
+    compressed = compress_outputs(outputs, previous)
+    if compressed.compressed:
+        print(f"Compressed {len(compressed.compressed)} outputs ({compressed.skipped} unchanged)")
+    return compressed.entries
+
+def remove_stale_siblings(old, new, docs_dir):
+    # removes compressed siblings the last build wrote that this one
+    # didn't (the output is gone, or a format no longer is available)
+    # and returns the ones that are current
+    current = {sibling for path, entry in new.items() for sibling in siblings(path, entry)}
+    for path, entry in old.items():
+        for sibling in siblings(path, entry):
+            if sibling not in current and os.path.exists(sibling):
+                print(f"Removing {sibling}")
+                remove_output(sibling, docs_dir)
+    return current
+
+def check_site_links(manifest, recheck, docs_dir):
+    # checks the links of the pages in recheck against every output,
+    # stores each page's broken links in its entry and prints them all
+    for src_md in recheck:
+        manifest.pages[src_md]["broken"] = []
+    for src_md, line, url in check_links({src_md: manifest.pages[src_md] for src_md in recheck},
+                                         list(manifest.static.values()) + list(manifest.pages.values()),
+                                         docs_dir, manifest.deps,
+                                         AssetMap.from_entries(manifest.assets) if manifest.assets else None):
+        manifest.pages[src_md]["broken"].append([line, url])
+    broken = [(src_md, line, url) for src_md, entry in sorted(manifest.pages.items())
+              for line, url in entry.get("broken", [])]
+    for src_md, line, url in broken:
+        print(f"Broken link: {src_md}:{line}: {url}")
+    return broken
+
+def write_search_index(manifest, pages, docs_dir, terms_path):
+    # re-rendered pages bring fresh terms; the rest come from the last
+    # build's saved terms as long as their source hash still matches, or
+    # are tokenized from the source if there are none (search was off
+    # last time, or the terms file is gone)
+    saved = load_search_terms(terms_path)
+    terms = {}
+    index = SearchIndex()
+    for src_md, entry in manifest.pages.items():
+        if src_md in pages:
+            page = pages[src_md]
+            terms[src_md] = {"hash": entry["hash"], "title": page["title"], "terms": page["terms"]}
+        elif entry["hash"] is None:
+            continue
+        elif saved.get(src_md, {}).get("hash") == entry["hash"]:
+            terms[src_md] = saved[src_md]
+        else:
+            title = entry.get("meta", {}).get("title")
+            if title is None:
+                continue
+            terms[src_md] = {"hash": entry["hash"], "title": title,
+                             "terms": count_terms(strip_front_matter(iter_lines(src_md), {}))}
+        index.add_page(page_url(entry["output"], docs_dir), terms[src_md]["title"], terms[src_md]["terms"])
+    save_search_terms(terms, terms_path)
+    written = index.write(os.path.join(docs_dir, "search"))
+    print(f"Search index: {len(index)} pages, {len(written) - 1} shards")
+    return written
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build ./content and ./static into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild outputs whose sources, template or basepath changed")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="render pages across N worker processes (0 uses every core)")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help=f"build only shard i of N into {path_shards}/i-of-N; combine them with 'merge N'")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading and writing pages with rendering them (for slow filesystems)")
+    parser.add_argument("--queue-depth", type=int, default=16, metavar="N",
+                        help="with --pipeline, hold at most N pages between any two stages")
+    parser.add_argument("--link", action="store_true",
+                        help="hardlink static files into docs/ instead of copying them")
+    parser.add_argument("--strict-links", action="store_true",
+                        help="fail the build if any page links to a path the site doesn't have")
+    parser.add_argument("--search", action="store_true",
+                        help="write a sharded full-text search index to docs/search/")
+    parser.add_argument("--compress", action="store_true",
+                        help="write precompressed .gz (and .br/.zst if available) siblings of outputs")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="serve static assets under content-hashed names (index.3fa9c1d2.css) and link to those")
+    parser.add_argument("--responsive-images", action="store_true",
+                        help=f"give images resized variants (cached in {path_images}) and a srcset, width and height")
+    parser.add_argument("--fragment-cache", action="store_true",
+                        help=f"reuse rendered HTML of identical blocks, saved in {path_fragments}")
+    parser.add_argument("--fragment-cache-size", type=int, default=DEFAULT_MAX_ENTRIES, metavar="N",
+                        help="keep at most N rendered blocks (least recently used are dropped)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each pipeline stage and print a per-stage report")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="list the N slowest pages in the profile report")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the profile report as JSON")
+    parser.add_argument("--trace", metavar="PATH", help="also write a Chrome trace of the profiled build")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        import serve
+        return serve.main(argv[1:])
+    if argv[:1] == ["merge"]:
+        return merge_main(argv[1:])
+    if argv[:1] == ["pages"]:
+        return pages_main(argv[1:])
+    args = parse_args(argv)
+    if args.basepath != "/":
+        print("------------------------------------------------")
+        print(f"User prompt: {args.basepath}")
+    profile = BuildProfile() if args.profile or args.profile_json or args.trace else None
+    docs_dir, manifest_path = path_docs, path_manifest
+    if args.shard is not None:
+        docs_dir, manifest_path = shard_paths(path_shards, args.shard)
+    build(args.basepath, incremental=args.incremental, jobs=args.jobs, docs_dir=docs_dir, manifest_path=manifest_path,
+          shard=args.shard,
+          fragment_cache_path=path_fragments if args.fragment_cache else None,
+          fragment_cache_size=args.fragment_cache_size, link=args.link, profile=profile,
+          strict_links=args.strict_links, search_terms_path=path_search_terms if args.search else None,
+          queue_depth=args.queue_depth if args.pipeline else None, compress=args.compress,
+          fingerprint=args.fingerprint, image_cache_dir=path_images if args.responsive_images else None)
+    if profile is not None:
+        print(profile.report(args.profile_top))
+        if args.profile_json:
+            profile.write_json(args.profile_json, args.profile_top)
+        if args.trace:
+            profile.write_chrome_trace(args.trace)
+
+def merge(count, shards_dir=path_shards, docs_dir=path_docs, manifest_path=path_manifest, link=False,
+          strict_links=False, compress=False):
+    previous = load_manifest(manifest_path)
+    # the last merge's siblings are kept for compress_site to reuse
+    keep = []
+    if compress:
+        for path, entry in previous.compressed.items():
+            keep.extend(siblings(path, entry))
+    merged, copied, removed = merge_shards(shards_dir, count, docs_dir, link, keep)
+    print(f"Merged {count} shards: {len(merged.pages)} pages, {len(merged.static)} static files "
+          f"({len(copied)} copied)")
+    for path in removed:
+        print(f"Removing {path}")
+    broken = check_site_links(merged, merged.pages, docs_dir)
+    if compress:
+        outputs = [entry["output"] for entry in list(merged.static.values()) + list(merged.pages.values())]
+        merged.compressed = compress_site(outputs, previous.compressed)
+        remove_stale_siblings(previous.compressed, merged.compressed, docs_dir)
+    save_manifest(merged, manifest_path)
+    if broken and strict_links:
+        raise Exception(f"{len(broken)} broken links")
+    return merged
+
+def merge_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py merge",
+                                     description=f"Combine the shard builds in {path_shards} into ./docs")
+    parser.add_argument("count", type=int, metavar="N", help="how many shards the site was built in")
+    parser.add_argument("--link", action="store_true", help="hardlink shard outputs instead of copying them")
+    parser.add_argument("--strict-links", action="store_true",
+                        help="fail if any page links to a path the merged site doesn't have")
+    parser.add_argument("--compress", action="store_true",
+                        help="write precompressed .gz (and .br/.zst if available) siblings of outputs")
+    args = parser.parse_args(argv)
+    merge(args.count, link=args.link, strict_links=args.strict_links, compress=args.compress)
+
+def pages_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py pages",
+                                     description="List pages by title and front matter without building them")
+    parser.add_argument("where", nargs="*", metavar="KEY=VALUE", help="only pages whose KEY is (or lists) VALUE")
+    parser.add_argument("--sort", metavar="KEY", default="url", help="order by this key (default: url)")
+    parser.add_argument("--reverse", action="store_true")
+    args = parser.parse_args(argv)
+    criteria = {}
+    for pair in args.where:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise Exception(f"expected KEY=VALUE, got {pair!r}")
+        criteria[key] = value
+    for page in scan_site().where(**criteria).sorted_by(args.sort, args.reverse):
+        print(f"{page['url']}\t{page.get('title', '')}")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
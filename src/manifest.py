@@ -0,0 +1,113 @@
+import hashlib, json, os
+
+from depgraph import DependencyGraph
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest():
+    # What the last build was made from: one entry per source file
+    # ({"hash": ..., "output": ...}) plus the template hash and basepath,
+    # since either of those changing invalidates every page, the
+    # dependency graph between pages and what they were built from, the
+    # outputs that got precompressed siblings (keyed by output path), for
+    # a fingerprinted build the asset URL map and with responsive images
+    # what was measured of each image (both None when not in use).
+
+    def __init__(self, basepath=None, template=None, pages=None, static=None, deps=None, compressed=None,
+                 assets=None, images=None):
+        self.basepath = basepath
+        self.template = template
+        self.pages = pages if pages is not None else {}
+        self.static = static if static is not None else {}
+        self.deps = deps if deps is not None else DependencyGraph()
+        self.compressed = compressed if compressed is not None else {}
+        self.assets = assets
+        self.images = images
+
+    def __eq__(self, other):
+        if not isinstance(other, Manifest):
+            return False
+        return (
+            self.basepath == other.basepath and
+            self.template == other.template and
+            self.pages == other.pages and
+            self.static == other.static and
+            self.deps == other.deps and
+            self.compressed == other.compressed and
+            self.assets == other.assets and
+            self.images == other.images)
+
+    def __repr__(self):
+        return f"Manifest({self.basepath}, {self.template}, {len(self.pages)} pages, {len(self.static)} static)"
+
+    def to_dict(self):
+        return {
+            "basepath": self.basepath,
+            "template": self.template,
+            "pages": self.pages,
+            "static": self.static,
+            "deps": self.deps.to_dict(),
+            "compressed": self.compressed,
+            "assets": self.assets,
+            "images": self.images,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("basepath"),
+            data.get("template"),
+            data.get("pages"),
+            data.get("static"),
+            DependencyGraph.from_dict(data.get("deps")),
+            data.get("compressed"),
+            data.get("assets"),
+            data.get("images"),
+        )
+
+    def is_current(self, section, src, entry):
+        # an entry is only up to date if its source is unchanged and the
+        # output it produced last time is still on disk; keys the old entry
+        # has beyond the new one (e.g. the links found) don't matter
+        old = getattr(self, section).get(src)
+        if old is None or any(old.get(key) != value for key, value in entry.items()):
+            return False
+        return os.path.exists(entry["output"])
+
+    def stale_outputs(self, section, current):
+        # outputs of sources that existed last build but are gone now, or
+        # that are written somewhere else now (a new fingerprinted name)
+        for src, entry in getattr(self, section).items():
+            if src not in current or current[src].get("output", entry["output"]) != entry["output"]:
+                yield entry["output"]
+
+
+def load_manifest(path):
+    # a missing or unreadable manifest just means "rebuild everything"
+    try:
+        with open(path) as f:
+            return Manifest.from_dict(json.load(f))
+    except (OSError, ValueError):
+        return Manifest()
+
+def save_json(data, path, **options):
+    # through a temp file, so an interrupted build leaves the last
+    # complete file in place; options go to json.dump
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, **options)
+    os.replace(tmp, path)
+
+def save_manifest(manifest, path):
+    save_json(manifest.to_dict(), path, indent=1, sort_keys=True)
@@ -1,5 +1,5 @@
 from enum import Enum
-from htmlnode import ParentNode, text_node_to_html_node
+from htmlnode import LeafNode, ParentNode, text_node_to_html_node
 from textnode import TextNode, TextType, text_to_textnodes
 
 class BlockType(Enum):
@@ -12,39 +12,146 @@ class BlockType(Enum):
     DEFAULT = "default"  # keep for tests
 
 
-def markdown_to_blocks(markdown):
-    lines = markdown.splitlines()
-    blocks = []
-    cur = []
-    in_code = False
-    for line in lines:
-        if line.strip() == "```":
-            if not in_code:
+def _is_ordered_item(line, number):
+    # "1. ...", "2. ...", ... exactly
+    dot = line.find(".")
+    return (dot > 0 and line[:dot].isdigit() and int(line[:dot]) == number and
+            dot + 1 < len(line) and line[dot + 1] == " ")
+
+# Each line-wise block type is told apart by its first character, so a
+# block has at most one candidate type, looked up from its first line;
+# every later line is then checked against that one rule only. The rule
+# is a prefix every line must start with, or None for numbered items.
+LINE_RULES = {
+    ">": (BlockType.QUOTE, ">"),
+    "-": (BlockType.UNORDERED_LIST, "- "),
+}
+ORDERED_RULE = (BlockType.ORDERED_LIST, None)
+HEADING_RULE = (BlockType.HEADING, None)
+
+def _line_ok(rule, line, number):
+    prefix = rule[1]
+    if prefix is not None:
+        return line.startswith(prefix)
+    return _is_ordered_item(line, number)
+
+def _heading_level(line):
+    # 1-6 hashes followed by a space, else 0
+    i = 0
+    while i < len(line) and line[i] == "#":
+        i += 1
+    if 1 <= i <= 6 and i < len(line) and line[i] == " ":
+        return i
+    return 0
+
+def _first_line_rule(line):
+    # what the first line makes the block: a heading, a candidate line
+    # rule, or (None) a paragraph
+    first = line[:1]
+    if first == "#" and _heading_level(line):
+        return HEADING_RULE
+    rule = LINE_RULES.get(first)
+    if rule is None and first.isdigit():
+        rule = ORDERED_RULE
+    if rule is not None and _line_ok(rule, line, 1):
+        return rule
+    return None
+
+
+class Block():
+    # One block of a document: its type, its lines (the text is just
+    # "\n".join(lines)) and the line numbers it spans in the source,
+    # start inclusive and end exclusive, counting from 1.
+    __slots__ = ("type", "lines", "start", "end")
+
+    def __init__(self, type, lines, start=None, end=None):
+        self.type = type
+        self.lines = lines
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return False
+        return self.type == other.type and self.lines == other.lines
+
+    def __repr__(self):
+        return f"Block({self.type}, {self.text!r}, {self.start}-{self.end})"
+
+
+def _finish(lines, rule):
+    # The splitter strips a block's text, so its last line loses any
+    # trailing space: re-check that line only if it had some.
+    last = lines[-1].rstrip()
+    if last != lines[-1]:
+        lines[-1] = last
+        if len(lines) == 1:
+            rule = _first_line_rule(last)
+        elif rule is not None and rule is not HEADING_RULE and not _line_ok(rule, last, len(lines)):
+            rule = None
+    return rule[0] if rule is not None else BlockType.PARAGRAPH
+
+def iter_typed_blocks(lines):
+    # Splits any iterable of lines, e.g. an open file, into Blocks and
+    # classifies each one in the same pass, so every line is looked at
+    # once and only the block being built is held in memory. Trailing
+    # newlines from file iteration are dropped.
+    current = None
+    rule = None
+    start = 0
+    code = None
+    number = 0
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip("\n")
+        stripped = line.strip()
+        if stripped == "```":
+            if code is None:
                 # starting a fence: flush current block, start code block
-                if cur:
-                    blocks.append("\n".join(cur).strip())
-                    cur = []
-                cur = ["```"]
-                in_code = True
+                if current is not None:
+                    yield Block(_finish(current, rule), current, start, number)
+                    current = None
+                code = ["```"]
+                start = number
             else:
                 # closing fence: finish code block
-                cur.append("```")
-                blocks.append("\n".join(cur).strip())
-                cur = []
-                in_code = False
-            continue
-        if in_code:
-            cur.append(line)
-            continue
-        if line.strip() == "":
-            if cur:
-                blocks.append("\n".join(cur).strip())
-                cur = []
+                code.append("```")
+                yield Block(BlockType.CODE, code, start, number + 1)
+                code = None
+        elif code is not None:
+            code.append(line)
+        elif not stripped:
+            if current is not None:
+                yield Block(_finish(current, rule), current, start, number)
+                current = None
+        elif current is None:
+            # the block's text is stripped, so its first line is too
+            line = line.lstrip()
+            current = [line]
+            rule = _first_line_rule(line)
+            start = number
         else:
-            cur.append(line)
-    if cur:
-        blocks.append("\n".join(cur).strip())
-    return [b for b in blocks if b]
+            current.append(line)
+            if rule is not None and rule is not HEADING_RULE and not _line_ok(rule, line, len(current)):
+                rule = None
+    if code is not None:
+        # an unclosed fence is a paragraph, blank lines and all
+        yield Block(BlockType.PARAGRAPH, "\n".join(code).strip().split("\n"), start, number + 1)
+    elif current is not None:
+        yield Block(_finish(current, rule), current, start, number + 1)
+
+def iter_blocks(lines):
+    for block in iter_typed_blocks(lines):
+        yield block.text
+
+def markdown_to_typed_blocks(markdown):
+    return list(iter_typed_blocks(markdown.splitlines()))
+
+def markdown_to_blocks(markdown):
+    return list(iter_blocks(markdown.splitlines()))
 
 def block_to_block_type(block):
     lines = block.split("\n")
@@ -53,133 +160,123 @@ def block_to_block_type(block):
     if len(lines) >= 2 and lines[0].strip() == "```" and lines[-1].strip() == "```":
         return BlockType.CODE
 
-    # heading: only first line, 1–6 hashes followed by a space
-    first = lines[0]
-    i = 0
-    while i < len(first) and first[i] == "#":
-        i += 1
-    if 1 <= i <= 6 and i < len(first) and first[i] == " ":
+    rule = _first_line_rule(lines[0])
+    if rule is HEADING_RULE:
         return BlockType.HEADING
-
-    # quote: every line starts with ">"
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-
-    # unordered: every line starts with "- "
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
-
-    # ordered: lines are "1. ...", "2. ...", ... exactly
-    ok = True
-    for idx, line in enumerate(lines, start=1):
-        # find first "."
-        dot = line.find(".")
-        if dot == -1:
-            ok = False
-            break
-        num_str = line[:dot]
-        if not num_str.isdigit():
-            ok = False
-            break
-        if int(num_str) != idx:
-            ok = False
+    for number, line in enumerate(lines[1:], start=2):
+        if rule is None:
             break
-        if dot + 1 >= len(line) or line[dot + 1] != " ":
-            ok = False
-            break
-    if ok:
-        return BlockType.ORDERED_LIST
+        if not _line_ok(rule, line, number):
+            rule = None
+    return rule[0] if rule is not None else BlockType.PARAGRAPH
 
-    return BlockType.PARAGRAPH
+def block_to_html_node(block, bt, basepath="/", lines=None, assets=None):
+    # lines: the block already split, as the splitter hands it over;
+    # assets: an AssetMap that root URLs are rewritten through
+    if lines is None:
+        lines = block.split("\n")
+    match bt:
+        case BlockType.CODE:
+            # strip the first and last fence lines
+            inner = "\n".join(lines[1:-1])
+            text_node = TextNode(inner, TextType.TEXT)
+            code_node = ParentNode("code", [text_node_to_html_node(text_node, basepath, assets)])
+            pre_node = ParentNode("pre", [code_node])
+            return pre_node
+        case BlockType.HEADING:
+            heading_count = len(block)-len(block.lstrip('#'))
+            heading_content = block[heading_count:].strip()
+            
+              # Parse inline markdown (like paragraphs!)
+            node_result = text_to_textnodes(heading_content)
+            html_nodes = []
+            for text_node in node_result:
+                html_node = text_node_to_html_node(text_node, basepath, assets)
+                html_nodes.append(html_node)
 
-def markdown_to_html_node(markdown):
-    children = []
-    blocks_result = markdown_to_blocks(markdown)
-    for block in blocks_result:
-        bt = block_to_block_type(block)
-        match bt:
-            case BlockType.CODE:
-                lines = block.split("\n")
-                # strip the first and last fence lines
-                inner = "\n".join(lines[1:-1])
-                text_node = TextNode(inner, TextType.TEXT)
-                code_node = ParentNode("code", [text_node_to_html_node(text_node)])
-                pre_node = ParentNode("pre", [code_node])
-                children.append(pre_node)
-            case BlockType.HEADING:
-                heading_count = len(block)-len(block.lstrip('#'))
-                heading_content = block[heading_count:].strip()
-                
-                  # Parse inline markdown (like paragraphs!)
-                node_result = text_to_textnodes(heading_content)
-                html_nodes = []
-                for text_node in node_result:
-                    html_node = text_node_to_html_node(text_node)
-                    html_nodes.append(html_node)
+            heading_node = ParentNode(f"h{heading_count}", html_nodes) 
+            return heading_node
+        case BlockType.QUOTE:
+            # strip '> ' from each line, then rejoin
+            quote_lines = [line.lstrip('> ').strip() for line in lines]
+            quote_content = ' '.join(quote_lines)
 
-                heading_node = ParentNode(f"h{heading_count}", html_nodes) 
-                children.append(heading_node)
-            case BlockType.QUOTE:
-                # Split into lines, strip '> ' from each, then rejoin
-                lines = block.split('\n')
-                quote_lines = [line.lstrip('> ').strip() for line in lines]
-                quote_content = ' '.join(quote_lines)
-    
-                # Parse inline markdown
-                node_result = text_to_textnodes(quote_content)
+            # Parse inline markdown
+            node_result = text_to_textnodes(quote_content)
+            html_nodes = []
+            for text_node in node_result:
+                html_node = text_node_to_html_node(text_node, basepath, assets)
+                html_nodes.append(html_node)
+
+            quote_node = ParentNode("blockquote", html_nodes)
+            return quote_node
+        case BlockType.UNORDERED_LIST:
+            # each line is a list item
+            list_items = []
+            for line in lines:
+                item_text = line.lstrip('*- ').strip()
+                node_result = text_to_textnodes(item_text)
                 html_nodes = []
                 for text_node in node_result:
-                    html_node = text_node_to_html_node(text_node)
+                    html_node = text_node_to_html_node(text_node, basepath, assets)
                     html_nodes.append(html_node)
     
-                quote_node = ParentNode("blockquote", html_nodes)
-                children.append(quote_node)
-            case BlockType.UNORDERED_LIST:
-                # Split into individual lines (each is a list item)
-                lines = block.split('\n')
-    
-                list_items = []
-                for line in lines:
-                    item_text = line.lstrip('*- ').strip()
-                    node_result = text_to_textnodes(item_text)
-                    html_nodes = []
-                    for text_node in node_result:
-                        html_node = text_node_to_html_node(text_node)
-                        html_nodes.append(html_node)
-        
-                    # Create <li> node for this item
-                    li_node = ParentNode("li", html_nodes)
-                    list_items.append(li_node)
-    
-                # Wrap all <li> nodes in <ul>
-                ul_node = ParentNode("ul", list_items)
-                children.append(ul_node)
-            case BlockType.ORDERED_LIST:
-                lines = block.split('\n')
-                list_items = []
-                for line in lines:
-                    dot = line.find(". ")
-                    item_text = line[dot+2:] if dot != -1 else line  # precise cut
-                    node_result = text_to_textnodes(item_text)
-                    html_nodes = []
-                    for text_node in node_result:
-                        html_node = text_node_to_html_node(text_node)
-                        html_nodes.append(html_node)
-                    li_node = ParentNode("li", html_nodes)
-                    list_items.append(li_node)
-                ul_node = ParentNode("ol", list_items)
-                children.append(ul_node)
-            case BlockType.PARAGRAPH:
-                # Replace newlines with spaces within the paragraph
-                paragraph_text = block.replace('\n', ' ')
-    
-                node_result = text_to_textnodes(paragraph_text)
+                # Create <li> node for this item
+                li_node = ParentNode("li", html_nodes)
+                list_items.append(li_node)
+
+            # Wrap all <li> nodes in <ul>
+            ul_node = ParentNode("ul", list_items)
+            return ul_node
+        case BlockType.ORDERED_LIST:
+            list_items = []
+            for line in lines:
+                dot = line.find(". ")
+                item_text = line[dot+2:] if dot != -1 else line  # precise cut
+                node_result = text_to_textnodes(item_text)
                 html_nodes = []
                 for text_node in node_result:
-                    html_node = text_node_to_html_node(text_node)
+                    html_node = text_node_to_html_node(text_node, basepath, assets)
                     html_nodes.append(html_node)
-                children.append(ParentNode('p', html_nodes))
-    return ParentNode('div', children)
+                li_node = ParentNode("li", html_nodes)
+                list_items.append(li_node)
+            ul_node = ParentNode("ol", list_items)
+            return ul_node
+        case BlockType.PARAGRAPH:
+            # Replace newlines with spaces within the paragraph
+            paragraph_text = block.replace('\n', ' ')
+
+            node_result = text_to_textnodes(paragraph_text)
+            html_nodes = []
+            for text_node in node_result:
+                html_node = text_node_to_html_node(text_node, basepath, assets)
+                html_nodes.append(html_node)
+            return ParentNode('p', html_nodes)
+    raise Exception("unsupported BlockType")
 
+def render_block(block, basepath="/", cache=None, assets=None):
+    text = block.text
+    if cache is None:
+        return block_to_html_node(text, block.type, basepath, block.lines, assets)
+    # identical blocks render identically: reuse the HTML, skip the parse
+    key = cache.key(text, block.type, basepath, assets)
+    html = cache.get(key)
+    if html is None:
+        html = block_to_html_node(text, block.type, basepath, block.lines, assets).to_html()
+        cache.put(key, html)
+    return LeafNode(None, html)
 
+def markdown_to_html_node(markdown, basepath="/", cache=None, assets=None):
+    children = []
+    for block in markdown_to_typed_blocks(markdown):
+        children.append(render_block(block, basepath, cache, assets))
+    return ParentNode('div', children)
 
+def iter_markdown_html(typed_blocks, basepath="/", cache=None, assets=None):
+    # Streaming counterpart of markdown_to_html_node(...).iter_html(): each
+    # block is rendered and emitted as soon as it is parsed, and no tree
+    # for the whole document is ever built.
+    yield "<div>"
+    for block in typed_blocks:
+        yield from render_block(block, basepath, cache, assets).iter_html()
+    yield "</div>"
@@ -0,0 +1,116 @@
+FRONT_MATTER = "---"
+# a leading "---" that isn't closed within this many lines is content
+MAX_FRONT_MATTER_LINES = 100
+
+
+def parse_value(value):
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [item.strip() for item in value[1:-1].split(",") if item.strip()]
+    return value
+
+def is_fence(line):
+    return line.strip() == FRONT_MATTER
+
+def has_front_matter(text):
+    # whether strip_front_matter has anything to look at in text: only the
+    # first line is read, so text without front matter isn't split
+    end = text.find("\n")
+    return is_fence(text[:end] if end >= 0 else text)
+
+def strip_front_matter(lines, meta):
+    # Passes lines through minus a leading block of "key: value" lines
+    # between two "---" lines, whose pairs go into meta. Lines are only
+    # held back while the block is still open.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    if not is_fence(first):
+        yield first
+        yield from lines
+        return
+    held = [first]
+    for line in lines:
+        held.append(line)
+        if is_fence(line):
+            for pair in held[1:-1]:
+                key, sep, value = pair.partition(":")
+                if sep and key.strip():
+                    meta[key.strip()] = parse_value(value)
+            yield from lines
+            return
+        if len(held) > MAX_FRONT_MATTER_LINES:
+            break
+    yield from held
+    yield from lines
+
+def title_of(block):
+    # extract_title's rule, but None instead of an error
+    heading_count = len(block) - len(block.lstrip("#"))
+    if heading_count == 0:
+        return None
+    return block[heading_count:].strip()
+
+def read_metadata(path):
+    # title and front matter from the head of the file: reading stops at
+    # the end of the first block, so the body is never loaded
+    meta = {}
+    block = []
+    with open(path, encoding="utf-8") as f:
+        for line in strip_front_matter(f, meta):
+            if line.strip():
+                block.append(line.rstrip("\n"))
+            elif block:
+                break
+    if "title" not in meta:
+        title = title_of("\n".join(block))
+        if title is not None:
+            meta["title"] = title
+    return meta
+
+
+class SiteIndex():
+    # Every page's URL, title and front matter, taken from the manifest
+    # entries the metadata pass filled in; what listing pages, sitemaps
+    # and navigation are built from.
+
+    def __init__(self, pages=None):
+        self.pages = sorted(pages or [], key=lambda page: page["url"])
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def __repr__(self):
+        return f"SiteIndex({len(self.pages)} pages)"
+
+    def where(self, **criteria):
+        # pages whose value for each key equals the given one, or for list
+        # values (e.g. tags) contains it
+        found = []
+        for page in self.pages:
+            for key, wanted in criteria.items():
+                value = page.get(key)
+                if value != wanted and not (isinstance(value, list) and wanted in value):
+                    break
+            else:
+                found.append(page)
+        return SiteIndex(found)
+
+    def sorted_by(self, key, reverse=False):
+        # pages that have key, in order of it
+        return sorted((page for page in self.pages if key in page), key=lambda page: page[key], reverse=reverse)
+
+    def values(self, key):
+        # every distinct value of key across the site, lists flattened
+        found = set()
+        for page in self.pages:
+            value = page.get(key)
+            if isinstance(value, list):
+                found.update(value)
+            elif value is not None:
+                found.add(value)
+        return sorted(found)
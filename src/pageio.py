@@ -0,0 +1,156 @@
+import contextlib, io, mmap, os, threading
+from concurrent.futures import ThreadPoolExecutor
+
+# sources at least this big are mapped instead of read through a buffer
+MMAP_THRESHOLD = 1 << 20
+WRITER_THREADS = 4
+
+
+def _universal_newlines(text):
+    # what open() in text mode would have returned
+    if "\r" in text:
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+def read_text(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            # decode straight from the page cache, skipping the bytes copy
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return _universal_newlines(str(m, "utf-8"))
+        return _universal_newlines(f.read().decode("utf-8"))
+
+def iter_lines(path):
+    # lines decoded one at a time from a mapping of the file, so a huge
+    # source never has to fit in memory as text
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for line in iter(m.readline, b""):
+                text = line.decode("utf-8")
+                if "\r" in text:
+                    yield from io.StringIO(text, newline=None)
+                else:
+                    yield text
+
+def same_bytes(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def write_bytes(path, data):
+    # Atomic replace, skipped when the file already holds exactly these
+    # bytes so its mtime (and rsync's view of it) stays put. Returns
+    # whether anything was written.
+    if same_bytes(path, data):
+        return False
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    return True
+
+def _same_file_contents(a, b):
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            while True:
+                chunk = fa.read(1 << 16)
+                if chunk != fb.read(1 << 16):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+class Capture():
+    # stands in for a Writer when the caller writes the bytes itself
+
+    def __init__(self):
+        self.path = None
+        self.data = None
+
+    def write(self, path, data):
+        self.path = path
+        self.data = data
+
+
+class Writer():
+    # Page outputs handed to a few threads, so rendering the next page
+    # overlaps the open/write/rename of the last. flush() waits for the
+    # batch and reports per path, streamed outputs included: True written,
+    # False already identical, or the exception that stopped it.
+
+    def __init__(self, threads=WRITER_THREADS):
+        self.pool = ThreadPoolExecutor(threads) if threads > 0 else None
+        self.pending = []
+        self.streamed = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def __repr__(self):
+        return f"Writer({self.written} written, {self.unchanged} unchanged, {len(self.pending)} pending)"
+
+    def write(self, path, data):
+        if self.pool is None:
+            self._count(write_bytes(path, data))
+        else:
+            self.pending.append((path, self.pool.submit(write_bytes, path, data)))
+
+    @contextlib.contextmanager
+    def stream(self, path):
+        # for outputs too big to hold: written through a temp file, which
+        # only replaces path if the contents differ
+        tmp = _tmp_path(path)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                yield f
+            if _same_file_contents(tmp, path):
+                os.remove(tmp)
+                self.streamed[path] = self._count(False)
+            else:
+                os.replace(tmp, path)
+                self.streamed[path] = self._count(True)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+
+    def _count(self, written):
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+        return written
+
+    def flush(self):
+        outcomes, self.streamed = self.streamed, {}
+        for path, future in self.pending:
+            try:
+                outcomes[path] = self._count(future.result())
+            except Exception as e:
+                outcomes[path] = e
+        self.pending = []
+        return outcomes
+
+    def close(self):
+        outcomes = self.flush()
+        if self.pool is not None:
+            self.pool.shutdown()
+        return outcomes
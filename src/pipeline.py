@@ -0,0 +1,64 @@
+import asyncio
+
+# end of input; each stage passes it on once all of its workers are done
+_DONE = object()
+
+
+class Stage():
+    # `func` is a coroutine function taking one item; what it returns goes
+    # to the next stage (None drops the item). `workers` items of the stage
+    # are in flight at once.
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+    def __repr__(self):
+        return f"Stage({self.name}, {self.workers} workers)"
+
+    async def run(self, inbox, outbox):
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # leave it for the other workers of this stage
+                    await inbox.put(_DONE)
+                    return
+                result = await self.func(item)
+                if result is not None and outbox is not None:
+                    await outbox.put(result)
+        await asyncio.gather(*(worker() for _ in range(self.workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+
+class Pipeline():
+    # Items flow from a source iterable through the stages over queues of
+    # at most `depth` items each, so a slow stage holds the ones before it
+    # back instead of letting their output pile up in memory.
+
+    def __init__(self, stages, depth=16):
+        if depth < 1:
+            raise Exception(f"queue depth must be at least 1, got {depth}")
+        self.stages = stages
+        self.depth = depth
+
+    def __repr__(self):
+        return f"Pipeline({' -> '.join(stage.name for stage in self.stages)}, depth {self.depth})"
+
+    async def _walk(self, items, outbox):
+        for item in items:
+            await outbox.put(item)
+        await outbox.put(_DONE)
+
+    async def run(self, items):
+        queues = [asyncio.Queue(self.depth) for _ in self.stages]
+        tasks = [self._walk(items, queues[0])]
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            tasks.append(stage.run(queues[i], outbox))
+        await asyncio.gather(*tasks)
+
+    def run_sync(self, items):
+        asyncio.run(self.run(items))
@@ -0,0 +1,197 @@
+import contextlib, json, os, time
+from collections import defaultdict
+
+# exclusive stages: time spent inside a nested stage is not counted again
+# in the stage around it, so a page's stages add up to its total
+STAGES = (
+    "read",
+    "template",
+    "markdown_to_blocks",
+    "text_to_textnodes",
+    "markdown_to_html_node",
+    "to_html",
+    "write",
+    "other",
+)
+
+# the page being profiled in this process; None means every timer is a
+# single attribute check and a plain call
+_current = None
+
+
+class PageProfile():
+
+    def __init__(self, src):
+        self.src = src
+        self.pid = os.getpid()
+        self.start_ns = time.perf_counter_ns()
+        self.total_ns = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stages = defaultdict(int)
+        self.events = []
+        self._nested = [0]
+
+    def __repr__(self):
+        return f"PageProfile({self.src}, {self.total_ns / 1e6:.2f} ms)"
+
+    def enter(self):
+        self._nested.append(0)
+        return time.perf_counter_ns()
+
+    def leave(self, name, start_ns, event=False):
+        elapsed = time.perf_counter_ns() - start_ns
+        nested = self._nested.pop()
+        self.stages[name] += elapsed - nested
+        self._nested[-1] += elapsed
+        if event:
+            self.events.append((name, start_ns, elapsed))
+
+    def finish(self):
+        self.total_ns = time.perf_counter_ns() - self.start_ns
+        self.stages["other"] += self.total_ns - self._nested[0]
+
+
+@contextlib.contextmanager
+def profile_page(src):
+    global _current
+    page = PageProfile(src)
+    _current = page
+    try:
+        yield page
+    finally:
+        page.finish()
+        _current = None
+
+@contextlib.contextmanager
+def stage(name):
+    # coarse stages also become events in the Chrome trace
+    page = _current
+    if page is None:
+        yield
+        return
+    start = page.enter()
+    try:
+        yield
+    finally:
+        page.leave(name, start, event=True)
+
+def timed(name, func):
+    def wrapper(*args, **kwargs):
+        page = _current
+        if page is None:
+            return func(*args, **kwargs)
+        start = page.enter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            page.leave(name, start)
+    wrapper.profiled = func
+    return wrapper
+
+def timed_iter(name, iterable):
+    # time spent producing each item, e.g. serializing HTML chunks while
+    # the consumer writes them out
+    page = _current
+    if page is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = page.enter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            page.leave(name, start)
+            return
+        page.leave(name, start)
+        yield item
+
+def instrument():
+    # wrap the parser's hot functions where markdown_blocks looks them up;
+    # safe to call more than once per process
+    import markdown_blocks
+    # splitting and classifying blocks is one pass, reported as
+    # markdown_to_blocks
+    for name, func_name in (("markdown_to_blocks", "markdown_to_typed_blocks"),
+                            ("text_to_textnodes", "text_to_textnodes")):
+        func = getattr(markdown_blocks, func_name)
+        if not hasattr(func, "profiled"):
+            setattr(markdown_blocks, func_name, timed(name, func))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class BuildProfile():
+
+    def __init__(self):
+        self.pages = []
+        self.wall_ns = 0
+
+    def add(self, page):
+        self.pages.append(page)
+
+    def stage_summary(self):
+        summary = {}
+        for name in STAGES:
+            values = sorted(page.stages.get(name, 0) for page in self.pages)
+            summary[name] = {
+                "total_ms": sum(values) / 1e6,
+                "p50_ms": percentile(values, 50) / 1e6,
+                "p90_ms": percentile(values, 90) / 1e6,
+                "p99_ms": percentile(values, 99) / 1e6,
+                "max_ms": (values[-1] if values else 0) / 1e6,
+            }
+        return summary
+
+    def slowest(self, top=10):
+        return sorted(self.pages, key=lambda page: page.total_ns, reverse=True)[:top]
+
+    def report(self, top=10):
+        total = sum(page.total_ns for page in self.pages)
+        lines = [f"Profile: {len(self.pages)} pages, {total / 1e6:.1f} ms rendering, {self.wall_ns / 1e6:.1f} ms wall"]
+        lines.append(f"{'stage':<24}{'total ms':>10}{'%':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for name, row in self.stage_summary().items():
+            share = 100 * row["total_ms"] * 1e6 / total if total else 0
+            lines.append(f"{name:<24}{row['total_ms']:>10.2f}{share:>6.1f}%{row['p50_ms']:>9.3f}"
+                         f"{row['p90_ms']:>9.3f}{row['p99_ms']:>9.3f}{row['max_ms']:>9.3f}")
+        lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+        for page in self.slowest(top):
+            lines.append(f"{page.total_ns / 1e6:>10.2f} ms {page.bytes_in / 1024:>9.1f} KB -> "
+                         f"{page.bytes_out / 1024:>9.1f} KB  {page.src}")
+        return "\n".join(lines)
+
+    def to_dict(self, top=10):
+        return {
+            "pages": len(self.pages),
+            "wall_ms": self.wall_ns / 1e6,
+            "stages": self.stage_summary(),
+            "slowest": [
+                {"src": page.src, "ms": page.total_ns / 1e6, "bytes_in": page.bytes_in, "bytes_out": page.bytes_out}
+                for page in self.slowest(top)
+            ],
+        }
+
+    def write_json(self, path, top=10):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(top), f, indent=1)
+
+    def write_chrome_trace(self, path):
+        # one row per worker process; open in chrome://tracing or Perfetto
+        origin = min((page.start_ns for page in self.pages), default=0)
+        events = []
+        for page in self.pages:
+            events.append({"name": page.src, "cat": "page", "ph": "X", "pid": 0, "tid": page.pid,
+                           "ts": (page.start_ns - origin) / 1000, "dur": page.total_ns / 1000,
+                           "args": {"bytes_in": page.bytes_in, "bytes_out": page.bytes_out,
+                                    "stages_ms": {k: v / 1e6 for k, v in page.stages.items()}}})
+            for name, start_ns, elapsed in page.events:
+                events.append({"name": name, "cat": "stage", "ph": "X", "pid": 0, "tid": page.pid,
+                               "ts": (start_ns - origin) / 1000, "dur": elapsed / 1000})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
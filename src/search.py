@@ -0,0 +1,123 @@
+import json, os, re
+from collections import Counter
+from manifest import save_json
+from textnode import text_to_textnodes
+
+# runs of letters and digits: "_" is italic markup when it isn't joining
+# two words, and either way not part of what a reader searches for
+WORD_RE = re.compile(r"[^\W_]{2,}")
+
+PREFIX_LENGTH = 2
+
+
+def tokenize(text):
+    # the words of the text nodes the line renders to, so link and image
+    # targets (addresses) and inline delimiters aren't indexed
+    words = []
+    for node in text_to_textnodes(text):
+        words.extend(WORD_RE.findall(node.text.lower()))
+    return words
+
+def scan_terms(lines, counts):
+    # passes lines through unchanged while counting the words on them into
+    # counts, so the streaming path can index a page as it renders it
+    for line in lines:
+        yield line
+        if line.strip() != "```":
+            counts.update(tokenize(line))
+
+def count_terms(lines):
+    counts = Counter()
+    for _ in scan_terms(lines, counts):
+        pass
+    return counts
+
+def shard_name(term, prefix_length=PREFIX_LENGTH):
+    prefix = term[:prefix_length]
+    # non-ASCII prefixes are hex-encoded to keep file names portable
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "x" + prefix.encode().hex()
+
+
+class SearchIndex():
+    # Inverted index written to docs/search/:
+    #   index.json    {"prefix_length": 2, "shards": [...], "pages": [[url, title], ...]}
+    #   <shard>.json  {term: [id gap, tf, id gap, tf, ...]}
+    # Page ids are positions in "pages"; each postings list is sorted by id
+    # and stores the gap from the previous id, so a client fetches
+    # index.json once and then only the shards its query terms fall in.
+
+    def __init__(self, prefix_length=PREFIX_LENGTH):
+        self.prefix_length = prefix_length
+        self.pages = []
+
+    def __len__(self):
+        return len(self.pages)
+
+    def add_page(self, url, title, terms):
+        self.pages.append((url, title, terms))
+
+    def shards(self):
+        shards = {}
+        for page_id, (url, title, terms) in enumerate(sorted(self.pages, key=lambda page: page[0])):
+            for term, tf in terms.items():
+                postings = shards.setdefault(shard_name(term, self.prefix_length), {}).setdefault(term, [])
+                postings.append((page_id, tf))
+        encoded = {}
+        for name, terms in shards.items():
+            encoded[name] = {}
+            for term, postings in sorted(terms.items()):
+                flat = []
+                previous = 0
+                for page_id, tf in postings:
+                    flat.append(page_id - previous)
+                    flat.append(tf)
+                    previous = page_id
+                encoded[name][term] = flat
+        return encoded
+
+    def write(self, out_dir):
+        # owns out_dir: shards that no longer exist are removed; returns
+        # every path written
+        os.makedirs(out_dir, exist_ok=True)
+        shards = self.shards()
+        pages = [[url, title] for url, title, terms in sorted(self.pages, key=lambda page: page[0])]
+        written = []
+        for name, terms in sorted(shards.items()):
+            written.append(_write_json(os.path.join(out_dir, name + ".json"), terms))
+        meta = {"prefix_length": self.prefix_length, "shards": sorted(shards), "pages": pages}
+        written.append(_write_json(os.path.join(out_dir, "index.json"), meta))
+        for name in os.listdir(out_dir):
+            path = os.path.join(out_dir, name)
+            if path not in written and name.endswith(".json"):
+                os.remove(path)
+        return written
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+    return path
+
+def decode_postings(flat):
+    # inverse of the gap encoding: [(page id, tf), ...]
+    postings = []
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        postings.append((page_id, flat[i + 1]))
+    return postings
+
+
+def load_search_terms(path):
+    # src -> {"hash", "title", "terms"} saved by the last build, so
+    # an incremental build only re-tokenizes the pages it re-renders
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_search_terms(terms, path):
+    save_json(terms, path, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,160 @@
+import argparse, functools, os, sys, threading, time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from main import (build, generate_page, page_output_path, remove_output,
+                  path_content, path_docs, path_manifest, path_static, path_template)
+from manifest import hash_file, save_manifest
+from depgraph import RENDER
+from fragment_cache import FragmentCache
+from sync import copy_file, is_synced, stamp
+
+
+def scan_tree(root, suffix=""):
+    # path -> (mtime_ns, size); paths are joined the same way os.walk does
+    # in find_pages and sync_tree so they line up with the manifest keys
+    found = {}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                stack.append(os.path.join(directory, entry.name))
+            elif entry.name.endswith(suffix):
+                stat = entry.stat()
+                found[os.path.join(directory, entry.name)] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+def diff_snapshots(old, new):
+    changed = [path for path, stamp in new.items() if old.get(path) != stamp]
+    removed = [path for path in old if path not in new]
+    return sorted(changed), sorted(removed)
+
+
+class SiteWatcher():
+    # Keeps the manifest, the parsed template and a fragment cache in
+    # memory between edits. poll() stats the inputs and rebuilds only the
+    # outputs that depend on what changed.
+
+    def __init__(self, manifest, basepath="/", content_dir=path_content, static_dir=path_static,
+                 docs_dir=path_docs, template_path=path_template):
+        self.manifest = manifest
+        self.basepath = basepath
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.docs_dir = docs_dir
+        self.template_path = template_path
+        self.cache = FragmentCache()
+        self.pages = scan_tree(content_dir, ".md")
+        self.static = scan_tree(static_dir)
+        self.template = self.template_stamp()
+
+    def template_stamp(self):
+        stat = os.stat(self.template_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        pages = scan_tree(self.content_dir, ".md")
+        static = scan_tree(self.static_dir)
+        template = self.template_stamp()
+        changed_pages, removed_pages = diff_snapshots(self.pages, pages)
+        changed_static, removed_static = diff_snapshots(self.static, static)
+        force = False
+        if template != self.template:
+            template_hash = hash_file(self.template_path)
+            if template_hash != self.manifest.template:
+                # pages built from the template (and any the graph doesn't
+                # know) re-render; cached fragments stay valid since the
+                # template only wraps them
+                self.manifest.template = template_hash
+                deps = self.manifest.deps
+                rendered_with = deps.dependents([self.template_path], RENDER)
+                changed_pages = sorted(src for src in pages if src in rendered_with or src not in deps)
+                force = True
+        self.pages, self.static, self.template = pages, static, template
+        return self.rebuild(changed_pages, removed_pages, changed_static, removed_static, force)
+
+    def rebuild(self, changed_pages=(), removed_pages=(), changed_static=(), removed_static=(), force=False):
+        rebuilt = 0
+        for src in changed_static:
+            src_stat = os.stat(src)
+            entry = dict(stamp(src_stat), output=os.path.join(self.docs_dir, os.path.relpath(src, self.static_dir)))
+            self.manifest.static[src] = entry
+            if is_synced(src, src_stat, entry["output"]):
+                continue
+            copy_file(src, entry["output"])
+            rebuilt += 1
+        for src_md in changed_pages:
+            entry = {"hash": hash_file(src_md), "output": page_output_path(src_md, self.content_dir, self.docs_dir)}
+            # skip saves that didn't change the file's content
+            if not force and self.manifest.is_current("pages", src_md, entry):
+                continue
+            try:
+                os.makedirs(os.path.dirname(entry["output"]), exist_ok=True)
+                page = generate_page(src_md, self.template_path, entry["output"], self.basepath, self.cache)
+                entry["links"] = page["links"]
+                self.manifest.deps.set(src_md, RENDER, [src_md, self.template_path])
+            except Exception as e:
+                print(f"Error generating {src_md}: {type(e).__name__}: {e}")
+                entry["hash"] = None
+            self.manifest.pages[src_md] = entry
+            rebuilt += 1
+        for section, removed in (("static", removed_static), ("pages", removed_pages)):
+            for src in removed:
+                entry = getattr(self.manifest, section).pop(src, None)
+                if section == "pages":
+                    self.manifest.deps.remove(src)
+                if entry is not None:
+                    print(f"Removing {entry['output']}")
+                    remove_output(entry["output"], self.docs_dir)
+                    rebuilt += 1
+        return rebuilt
+
+    def watch(self, interval=0.05, stop=None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            started = time.perf_counter()
+            rebuilt = self.poll()
+            if rebuilt:
+                print(f"Rebuilt {rebuilt} outputs in {(time.perf_counter() - started) * 1000:.1f} ms")
+            stop.wait(interval)
+
+
+def start_server(docs_dir, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=docs_dir)
+    server = ThreadingHTTPServer(("", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Build ./docs and serve it")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--watch", action="store_true",
+                        help="poll content/, static/ and the template and rebuild what changed")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.05, metavar="SECONDS",
+                        help="how often --watch polls for changes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    manifest = build(args.basepath, incremental=True)
+    server = start_server(path_docs, args.port)
+    print(f"Serving {path_docs} on http://localhost:{args.port}/")
+    try:
+        if args.watch:
+            watcher = SiteWatcher(manifest, args.basepath)
+            watcher.watch(args.interval)
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        save_manifest(manifest, path_manifest)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse, hashlib, os
+
+from manifest import Manifest, load_manifest
+from sync import copy_file, is_synced, prune_tree
+
+
+def parse_shard(text):
+    # "i/N" with 1 <= i <= N, the way CI systems number parallel nodes;
+    # the argparse type of --shard, so a bad value is a usage error
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {text!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+def shard_of(rel_path, count):
+    # a stable hash of the path relative to its root, so every machine
+    # agrees on the split whatever its OS or Python hash seed
+    key = rel_path.replace(os.sep, "/").encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % count + 1
+
+def in_shard(rel_path, shard):
+    index, count = shard
+    return shard_of(rel_path, count) == index
+
+def shard_paths(root, shard):
+    # (docs dir, manifest path) of one shard's build under root
+    index, count = shard
+    shard_root = os.path.join(root, f"{index}-of-{count}")
+    return os.path.join(shard_root, "docs"), os.path.join(shard_root, "manifest.json")
+
+
+def merge_shards(root, count, docs_dir, link=False, keep=()):
+    # Combines the N shard builds under root into docs_dir and returns
+    # (merged manifest, copied outputs, removed outputs); files in keep
+    # survive the pruning too. Raises, touching nothing, if a shard is
+    # missing, shards disagree on how the site was built, a page failed,
+    # or two shards claim the same source or output.
+    shards = []
+    missing = []
+    for index in range(1, count + 1):
+        shard_docs, manifest_path = shard_paths(root, (index, count))
+        if not os.path.exists(manifest_path):
+            missing.append(f"{index}/{count}")
+            continue
+        shards.append((index, shard_docs, load_manifest(manifest_path)))
+    if missing:
+        raise Exception(f"missing shard builds: {', '.join(missing)}")
+
+    first = shards[0][2]
+    merged = Manifest(first.basepath, first.template, assets=first.assets, images=first.images)
+    conflicts = []
+    owners = {}
+    copies = []
+    for index, shard_docs, manifest in shards:
+        if (manifest.basepath, manifest.template) != (merged.basepath, merged.template):
+            conflicts.append(f"shard {index}/{count} was built with a different basepath or template")
+        elif (manifest.assets, manifest.images) != (merged.assets, merged.images):
+            conflicts.append(f"shard {index}/{count} was built with different static assets")
+        for section in ("static", "pages"):
+            entries = getattr(merged, section)
+            for src, entry in sorted(getattr(manifest, section).items()):
+                if section == "pages" and entry["hash"] is None:
+                    conflicts.append(f"{src} failed to build in shard {index}/{count}")
+                if src in entries:
+                    conflicts.append(f"{src} built by shards {owners[entries[src]['output']][0]} and {index}")
+                    continue
+                output = os.path.join(docs_dir, os.path.relpath(entry["output"], shard_docs))
+                if output in owners:
+                    other, other_src = owners[output]
+                    conflicts.append(f"{output} written by {other_src} (shard {other}) and {src} (shard {index})")
+                    continue
+                owners[output] = (index, src)
+                entries[src] = dict(entry, output=output)
+                copies.append((entry["output"], output))
+        for page in manifest.deps.edges:
+            merged.deps.copy_from(manifest.deps, page)
+    if conflicts:
+        raise Exception("cannot merge shards:\n  " + "\n  ".join(conflicts))
+
+    copied = []
+    for shard_output, output in copies:
+        if not is_synced(shard_output, os.stat(shard_output), output):
+            copy_file(shard_output, output, link=link)
+            copied.append(output)
+    removed = prune_tree(docs_dir, set(owners) | set(keep)) if os.path.isdir(docs_dir) else []
+    return merged, copied, removed
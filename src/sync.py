@@ -0,0 +1,158 @@
+import os, shutil
+from concurrent.futures import ThreadPoolExecutor
+from manifest import hash_file
+
+# Linux ioctl to share extents between files (btrfs, xfs, overlayfs...)
+FICLONE = 0x40049409
+
+DEFAULT_WORKERS = 8
+
+
+def scan_files(root):
+    # relative path -> stat for every file under root; scandir hands back
+    # the entries and their stat without a separate isfile() per name
+    found = {}
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = list(os.scandir(os.path.join(root, rel_dir)))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            rel = os.path.join(rel_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(rel)
+            else:
+                found[rel] = entry.stat()
+    return found
+
+def stamp(stat):
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+def is_synced(src, src_stat, dst, checksum=False):
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return True
+    if checksum and hash_file(src) == hash_file(dst):
+        # same bytes, just touched: align the mtime so the next check is cheap
+        os.utime(dst, ns=(dst_stat.st_atime_ns, src_stat.st_mtime_ns))
+        return True
+    return False
+
+def _reflink(src_fd, dst_fd):
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+def _copy_range(src_fd, dst_fd, size):
+    # in-kernel copy: copy_file_range where available, else sendfile
+    copy = getattr(os, "copy_file_range", None)
+    offset = 0
+    try:
+        while offset < size:
+            if copy is not None:
+                sent = copy(src_fd, dst_fd, size - offset)
+            else:
+                sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+        return offset == size
+    except OSError:
+        return False
+
+def copy_file(src, dst, link=False):
+    # Copies through a temp file and renames it into place, so a reader
+    # never sees a half-written file and a hardlinked destination is
+    # replaced rather than written through. The source mtime is kept so
+    # is_synced() can skip the file next time.
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp = dst + ".sync-tmp"
+    if link:
+        try:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return "link"
+        except OSError:
+            pass
+    src_stat = os.stat(src)
+    method = "copy"
+    with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+        if _reflink(fsrc.fileno(), fdst.fileno()):
+            method = "reflink"
+        elif _copy_range(fsrc.fileno(), fdst.fileno(), src_stat.st_size):
+            method = "range"
+        else:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copymode(src, tmp)
+    os.utime(tmp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    os.replace(tmp, dst)
+    return method
+
+
+class SyncResult():
+
+    def __init__(self):
+        self.entries = {}
+        self.copied = []
+        self.skipped = 0
+
+    def __repr__(self):
+        return f"SyncResult({len(self.copied)} copied, {self.skipped} unchanged)"
+
+
+def sync_tree(src_dir, dst_dir, workers=DEFAULT_WORKERS, link=False, checksum=False, select=None, rename=None):
+    # Mirror every file under src_dir (or those whose relative path select
+    # accepts) into dst_dir, copying only files whose size or mtime differ
+    # from the destination; rename maps a relative path to the one it is
+    # copied to, if different. Entries are keyed the way os.walk joins
+    # paths so they match the manifest's static section.
+    result = SyncResult()
+    pending = []
+    for rel, src_stat in sorted(scan_files(src_dir).items()):
+        if select is not None and not select(rel):
+            continue
+        src = os.path.join(src_dir, rel)
+        dst = os.path.join(dst_dir, rename.get(rel, rel) if rename else rel)
+        result.entries[src] = dict(stamp(src_stat), output=dst)
+        if is_synced(src, src_stat, dst, checksum):
+            result.skipped += 1
+        else:
+            pending.append((src, dst))
+    if len(pending) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda job: copy_file(*job, link=link), pending))
+    else:
+        for src, dst in pending:
+            copy_file(src, dst, link=link)
+    result.copied = [dst for src, dst in pending]
+    return result
+
+def prune_tree(root, keep):
+    # delete every file under root that isn't in keep, then any directory
+    # left empty; root itself stays
+    keep = {os.path.normpath(path) for path in keep}
+    removed = []
+    for rel in sorted(scan_files(root)):
+        path = os.path.join(root, rel)
+        if os.path.normpath(path) not in keep:
+            os.remove(path)
+            removed.append(path)
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if dirpath != root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
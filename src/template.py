@@ -0,0 +1,71 @@
+import os, re
+
+SLOT_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTR_RE = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+def rewrite_root_urls(html, basepath="/", assets=None):
+    if assets is not None:
+        html = URL_ATTR_RE.sub(lambda m: f'{m.group(1)}="{assets.resolve(m.group(2))}"', html)
+    if basepath == "/":
+        return html
+    update_href = html.replace('href="/', f'href="{basepath}')
+    return update_href.replace('src="/', f'src="{basepath}')
+
+
+class Template():
+    # A template parsed once into literal text and {{ Slot }} placeholders.
+    # Root URLs in the literal text are rewritten for basepath (and to
+    # fingerprinted asset names) here, so rendering a page is just a join
+    # over the segments. urls keeps every href and src as written.
+
+    def __init__(self, source, basepath="/", assets=None):
+        self.basepath = basepath
+        self.urls = [match.group(2) for match in URL_ATTR_RE.finditer(source)]
+        self.segments = []
+        pos = 0
+        for match in SLOT_RE.finditer(source):
+            self.segments.append(rewrite_root_urls(source[pos:match.start()], basepath, assets))
+            self.segments.append((match.group(1), match.group(0)))
+            pos = match.end()
+        self.segments.append(rewrite_root_urls(source[pos:], basepath, assets))
+
+    def __repr__(self):
+        return f"Template({self.slots}, {self.basepath})"
+
+    @property
+    def slots(self):
+        return [segment[0] for segment in self.segments[1::2]]
+
+    def iter_render(self, values):
+        # a value may be a string or an iterable of chunks (a streamed
+        # HTMLNode); slots without a value are left as written
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                yield segment
+                continue
+            name, raw = segment
+            value = values.get(name, raw)
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+    def render(self, values):
+        return "".join(self.iter_render(values))
+
+
+_templates = {}
+
+def load_template(path, basepath="/", assets=None):
+    # parsed once per process, basepath and asset map; re-read only if the
+    # file changed
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(path), basepath, assets.digest if assets is not None else None)
+    cached = _templates.get(key)
+    if cached is None or cached[0] != stamp:
+        with open(path) as f:
+            cached = (stamp, Template(f.read(), basepath, assets))
+        _templates[key] = cached
+    return cached[1]
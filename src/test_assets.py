@@ -0,0 +1,133 @@
+import contextlib, io, json, os, unittest
+
+from assets import AssetMap, asset_urls, changed_assets, fingerprint_assets, fingerprinted_url
+from main import build
+from manifest import hash_bytes
+from template import Template
+from test_main import SiteTestCase
+
+
+class TestAssetMap(unittest.TestCase):
+
+    def test_fingerprinted_url(self):
+        self.assertEqual(fingerprinted_url("/index.css", "3fa9c1d2e5"), "/index.3fa9c1d2.css")
+        self.assertEqual(fingerprinted_url("/a.b/x.min.js", "0123456789"), "/a.b/x.min.01234567.js")
+
+    def test_resolve(self):
+        assets = AssetMap({"/index.css": "/index.11.css", "/images/a.png": "/images/a.22.png"})
+        self.assertEqual(assets.resolve("/index.css"), "/index.11.css")
+        self.assertEqual(assets.resolve("/images/a.png?w=2#top"), "/images/a.22.png?w=2#top")
+        for url in ("index.css", "//cdn/index.css", "/other.css", "https://x/index.css"):
+            self.assertEqual(assets.resolve(url), url)
+        self.assertNotEqual(assets.digest, AssetMap({"/index.css": "/index.12.css"}).digest)
+
+    def test_relative_urls_resolved_against_the_page(self):
+        assets = AssetMap({"/images/a.png": "/images/a.22.png"})
+        page = assets.at("/blog/post.html")
+        self.assertEqual(page.resolve("../images/a.png#x"), "../images/a.22.png#x")
+        self.assertEqual(page.resolve("/images/a.png"), "/images/a.22.png")
+        self.assertEqual(page.resolve("images/a.png"), "images/a.png")
+        self.assertEqual(assets.at("/index.html").resolve("images/a.png"), "images/a.22.png")
+        self.assertEqual(assets.resolve("images/a.png"), "images/a.png")
+        self.assertEqual(asset_urls(["../images/a.png", "mailto:x", "#top"], "/blog/post.html"), ["/images/a.png"])
+
+    def test_asset_urls_and_changes(self):
+        self.assertEqual(asset_urls(["/a.png?x", "/blog/", "a.css", "//cdn/b.js", "/a.png", "/c.JS"]),
+                         ["/a.png", "/c.JS"])
+        old = {"/a.css": {"url": "/a.1.css"}, "/b.css": {"url": "/b.1.css"}, "/gone.js": {"url": "/gone.1.js"}}
+        new = {"/a.css": {"url": "/a.1.css"}, "/b.css": {"url": "/b.2.css"}, "/new.js": {"url": "/new.1.js"}}
+        self.assertEqual(changed_assets(old, new), ["/b.css", "/gone.js", "/new.js"])
+        self.assertEqual(changed_assets(None, {}), [])
+
+    def test_template_urls_rewritten(self):
+        assets = AssetMap({"/index.css": "/index.11.css"})
+        template = Template('<link href="/index.css"><a href="/blog/">{{ Content }}</a>', "/site/", assets)
+        self.assertEqual(template.render({"Content": ""}), '<link href="/site/index.11.css"><a href="/site/blog/"></a>')
+        self.assertEqual(template.urls, ["/index.css", "/blog/"])
+
+
+class TestFingerprintedBuild(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, '<link href="/index.css" />{{ Content }}')
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.write(os.path.join(self.static, "robots.txt"), "")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](/images/a.png) [css](/index.css)")
+        self.css = "/index." + hash_bytes(b"body {}")[:8] + ".css"
+        self.png = "/images/a." + hash_bytes(b"png")[:8] + ".png"
+
+    def build(self, incremental=True, fingerprint=True):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", incremental=incremental, content_dir=self.content, static_dir=self.static,
+                  docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest,
+                  strict_links=True, fingerprint=fingerprint)
+        return out.getvalue()
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_outputs_and_urls_are_fingerprinted(self):
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, self.css[1:])))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "robots.txt")))
+        self.assertIn(f'href="{self.css}"', self.read("index.html"))
+        post = self.read("blog", "post.html")
+        self.assertIn(f'src="{self.png}"', post)
+        self.assertIn(f'href="{self.css}"', post)
+        with open(self.manifest) as f:
+            assets = json.load(f)["assets"]
+        self.assertEqual(sorted(assets), ["/images/a.png", "/index.css"])
+        self.assertEqual(assets["/index.css"]["url"], self.css)
+
+    def test_changed_asset_rerenders_only_its_pages(self):
+        self.build()
+        self.write(os.path.join(self.static, "images", "a.png"), "new png")
+        out = self.build()
+        self.assertEqual(out.count("Generating page"), 1)
+        png = "/images/a." + hash_bytes(b"new png")[:8] + ".png"
+        self.assertIn(f'src="{png}"', self.read("blog", "post.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, self.png[1:])))
+        # the template links the stylesheet, so every page uses it
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.build().count("Generating page"), 2)
+
+    def test_unchanged_assets_are_not_rehashed(self):
+        self.build()
+        with open(self.manifest) as f:
+            data = json.load(f)
+        data["assets"]["/index.css"]["hash"] = "f" * 64
+        self.assertEqual(fingerprint_assets(self.static, data["assets"])["/index.css"]["url"], "/index.ffffffff.css")
+
+    def test_toggling_fingerprints_rebuilds_pages(self):
+        self.build()
+        self.assertEqual(self.build(fingerprint=False).count("Generating page"), 2)
+        self.assertIn('href="/index.css"', self.read("index.html"))
+        self.assertEqual(sorted(os.listdir(self.docs)), ["blog", "images", "index.css", "index.html", "robots.txt"])
+        self.assertEqual(os.listdir(os.path.join(self.docs, "images")), ["a.png"])
+
+    def test_relative_asset_links_are_fingerprinted(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](../images/a.png)")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[a](images/a.png)")
+        self.build()
+        self.assertIn(f'src="..{self.png}"', self.read("blog", "post.html"))
+        self.assertIn(f'href="{self.png[1:]}"', self.read("index.html"))
+        self.write(os.path.join(self.static, "images", "a.png"), "new png")
+        self.assertEqual(self.build().count("Generating page"), 2)
+
+    def test_links_checked_as_rewritten(self):
+        # the asset's own name isn't served, so a link the map can't
+        # rewrite is broken
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/images/a.png?x) ![b](images/b.png)")
+        with self.assertRaises(Exception):
+            self.build()
+        with open(self.manifest) as f:
+            pages = json.load(f)["pages"]
+        self.assertEqual(pages[os.path.join(self.content, "index.md")]["broken"], [[3, "images/b.png"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import contextlib, gzip, io, os, unittest
+
+from compress import available_formats, compress_outputs, is_compressible
+from main import build
+from test_main import SiteTestCase
+
+
+class TestCompress(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "logo.png"), "png" * 100)
+
+    def build(self, incremental=True, compress=True):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", incremental=incremental, content_dir=self.content, static_dir=self.static,
+                  docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest,
+                  compress=compress)
+        return out.getvalue()
+
+    def read_gz(self, path):
+        with gzip.open(path + ".gz", "rb") as f:
+            return f.read()
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible("docs/index.html"))
+        self.assertTrue(is_compressible("docs/index.css"))
+        self.assertFalse(is_compressible("docs/images/a.PNG"))
+        self.assertFalse(is_compressible("docs/index.html.gz"))
+
+    def test_siblings_match_outputs(self):
+        out = self.build()
+        self.assertIn("Compressed 3 outputs (0 unchanged)", out)
+        for rel in ("index.html", os.path.join("blog", "post.html"), "index.css"):
+            path = os.path.join(self.docs, rel)
+            with open(path, "rb") as f:
+                self.assertEqual(self.read_gz(path), f.read())
+            for suffix in available_formats():
+                self.assertTrue(os.path.exists(path + suffix))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "logo.png.gz")))
+
+    def test_unchanged_outputs_are_skipped(self):
+        self.build()
+        index = os.path.join(self.docs, "index.html")
+        mtime = os.stat(index + ".gz").st_mtime_ns
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nnew body")
+        # full builds reuse the manifest's record too
+        out = self.build(incremental=False)
+        self.assertIn("Compressed 1 outputs (2 unchanged)", out)
+        self.assertEqual(os.stat(index + ".gz").st_mtime_ns, mtime)
+        self.assertIn(b"new body", self.read_gz(os.path.join(self.docs, "blog", "post.html")))
+
+    def test_missing_sibling_is_rewritten(self):
+        self.build()
+        css = os.path.join(self.docs, "index.css")
+        os.remove(css + ".gz")
+        self.assertIn("Compressed 1 outputs (2 unchanged)", self.build())
+        self.assertEqual(self.read_gz(css), b"body {}")
+
+    def test_stale_siblings_are_removed(self):
+        self.build()
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(post + ".gz"))
+        self.build(compress=False)
+        self.assertEqual(sorted(os.listdir(self.docs)), ["index.css", "index.html", "logo.png"])
+
+    def test_compress_outputs_threads(self):
+        paths = []
+        for i in range(6):
+            path = os.path.join(self.root, f"f{i}.txt")
+            self.write(path, f"file {i} " * 50)
+            paths.append(path)
+        result = compress_outputs(paths, {}, threads=3)
+        self.assertEqual(sorted(result.compressed), paths)
+        again = compress_outputs(paths, result.entries, threads=3)
+        self.assertEqual((again.compressed, again.skipped), ([], 6))
+        self.assertEqual(self.read_gz(paths[2]), b"file 2 " * 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os, random, shutil, tempfile, unittest
+
+from corpus import inline_text, make_page, page_path, write_corpus
+from textnode import TextType, text_to_textnodes
+from markdown_blocks import markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_deterministic(self):
+        self.assertEqual(make_page(random.Random(5), "T"), make_page(random.Random(5), "T"))
+        self.assertNotEqual(make_page(random.Random(5), "T"), make_page(random.Random(6), "T"))
+
+    def test_inline_text_link_count(self):
+        nodes = text_to_textnodes(inline_text(random.Random(0), 500, links=40))
+        links = [n for n in nodes if n.text_type in (TextType.LINK, TextType.IMAGE)]
+        self.assertEqual(len(links), 40)
+
+    def test_page_renders(self):
+        html = markdown_to_html_node(make_page(random.Random(0), "Title", code_lines=3)).to_html()
+        for tag in ("<h1>", "<blockquote>", "<ul>", "<ol>", "<pre><code>", "<h2>", "<a href="):
+            self.assertIn(tag, html)
+
+    def test_page_path_nesting(self):
+        self.assertEqual(page_path(123, 3), os.path.join("d3", "d2", "d1", "page-000123.md"))
+        self.assertEqual(page_path(7, 0), "page-000007.md")
+
+    def test_write_corpus(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        content, static, template = write_corpus(root, pages=12, depth=2)
+        found = [name for _, _, names in os.walk(content) for name in names]
+        self.assertEqual(len(found), 12)
+        self.assertTrue(os.path.exists(template))
+        self.assertTrue(os.path.exists(os.path.join(static, "index.css")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json, os, unittest
+
+from depgraph import LINK, RENDER, DependencyGraph
+from test_main import SiteTestCase
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.set("a.md", RENDER, ["a.md", "template.html"])
+        self.graph.set("b.md", RENDER, ["b.md", "template.html"])
+        self.graph.set("a.md", LINK, ["/b", "/index.css", "/b"])
+
+    def test_dependents_by_kind(self):
+        self.assertEqual(self.graph.dependents(["template.html"], RENDER), {"a.md", "b.md"})
+        self.assertEqual(self.graph.dependents(["/index.css"], LINK), {"a.md"})
+        self.assertEqual(self.graph.dependents(["/index.css"], RENDER), set())
+        self.assertEqual(self.graph.get("a.md", LINK), ["/b", "/index.css"])
+
+    def test_dependents_are_transitive(self):
+        self.graph.set("c.md", RENDER, ["a.md"])
+        self.assertEqual(self.graph.dependents(["template.html"], RENDER), {"a.md", "b.md", "c.md"})
+
+    def test_updates_invalidate_reverse_index(self):
+        self.graph.dependents(["/b"], LINK)
+        self.graph.set("b.md", LINK, ["/b"])
+        self.assertEqual(self.graph.dependents(["/b"], LINK), {"a.md", "b.md"})
+        self.graph.remove("a.md")
+        self.assertEqual(self.graph.dependents(["/b"], LINK), {"b.md"})
+
+    def test_round_trip(self):
+        data = json.loads(json.dumps(self.graph.to_dict()))
+        self.assertEqual(DependencyGraph.from_dict(data), self.graph)
+
+
+class TestBuildDependencies(SiteTestCase):
+
+    def load(self):
+        with open(self.manifest) as f:
+            return json.load(f)
+
+    def test_graph_saved_with_manifest(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) ![css](index.css)")
+        self.build()
+        deps = self.load()["deps"]
+        index = os.path.join(self.content, "index.md")
+        self.assertEqual(deps[index][RENDER], sorted([index, self.template]))
+        self.assertEqual(deps[index][LINK], ["/blog/post", "/index.css"])
+
+    def test_only_pages_linking_to_changed_urls_rechecked(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[new](/new)")
+        self.assertIn("Broken link", self.build())
+        # mark the post so a re-check would be visible
+        data = self.load()
+        data["pages"][os.path.join(self.content, "blog", "post.md")]["broken"] = [[1, "/kept"]]
+        self.write(self.manifest, json.dumps(data))
+        self.write(os.path.join(self.content, "new.md"), "# New")
+        out = self.build()
+        self.assertNotIn(": /new", out)
+        self.assertIn("/kept", out)
+        self.assertEqual(out.count("Generating page"), 1)
@@ -0,0 +1,58 @@
+import os, shutil, tempfile, unittest
+
+from assets import AssetMap
+from fragment_cache import FragmentCache, load_fragment_cache, save_fragment_cache
+from markdown_blocks import BlockType, markdown_to_html_node
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_key_depends_on_type_and_basepath(self):
+        key = FragmentCache.key("- a", BlockType.UNORDERED_LIST)
+        self.assertEqual(key, FragmentCache.key("- a", BlockType.UNORDERED_LIST))
+        self.assertNotEqual(key, FragmentCache.key("- a", BlockType.PARAGRAPH))
+        self.assertNotEqual(key, FragmentCache.key("- a", BlockType.UNORDERED_LIST, "/site/"))
+
+    def test_key_scoped_to_page_directory_for_links(self):
+        blog, root = AssetMap().at("/blog/a.html"), AssetMap().at("/index.html")
+        key = FragmentCache.key
+        self.assertEqual(key("text", BlockType.PARAGRAPH, "/", blog), key("text", BlockType.PARAGRAPH, "/", root))
+        self.assertEqual(key("[a](x.png)", BlockType.PARAGRAPH, "/", blog),
+                         key("[a](x.png)", BlockType.PARAGRAPH, "/", AssetMap().at("/blog/b.html")))
+        self.assertNotEqual(key("[a](x.png)", BlockType.PARAGRAPH, "/", blog),
+                            key("[a](x.png)", BlockType.PARAGRAPH, "/", root))
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = FragmentCache(max_entries=2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "evictions": 1, "entries": 2})
+
+    def test_markdown_to_html_node_with_cache(self):
+        md = "# Title\n\nsame **block**\n\n- x\n\nsame **block**"
+        cache = FragmentCache()
+        html = markdown_to_html_node(md, cache=cache).to_html()
+        self.assertEqual(html, markdown_to_html_node(md).to_html())
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(markdown_to_html_node(md, cache=cache).to_html(), html)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_save_and_load_keeps_lru_order(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, ".build", "fragments.json")
+        cache = FragmentCache()
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        save_fragment_cache(cache, path)
+        loaded = load_fragment_cache(path, max_entries=1)
+        self.assertEqual(list(loaded.entries.items()), [("a", "1")])
+        self.assertEqual(len(load_fragment_cache(os.path.join(root, "missing.json"))), 0)
+
+if __name__ == "__main__":
+    unittest.main()
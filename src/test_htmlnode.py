@@ -1,4 +1,5 @@
 # python
+import copy, io, pickle
 import unittest
 from src.htmlnode import LeafNode, HTMLNode, ParentNode
 from textnode import TextNode, TextType
@@ -52,5 +53,74 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(html_node.tag, None)
         self.assertEqual(html_node.value, "This is a text node")
 
+    def test_link_and_image_urls_resolved_under_basepath(self):
+        link = text_node_to_html_node(TextNode("t", TextType.LINK, "/blog/tom"), "/site/")
+        self.assertEqual(link.props, {"href": "/site/blog/tom"})
+        image = text_node_to_html_node(TextNode("a", TextType.IMAGE, "https://x/y.png"), "/site/")
+        self.assertEqual(image.props["src"], "https://x/y.png")
+
+    def test_nodes_are_slotted_and_share_empty_props(self):
+        a = LeafNode("b", "x")
+        b = ParentNode("p", [a])
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertFalse(hasattr(b, "__dict__"))
+        self.assertIs(a.props, b.props)
+        self.assertEqual(a.props, {})
+        self.assertEqual(a.children, ())
+        with self.assertRaises(TypeError):
+            a.props["href"] = "/x"
+
+    def test_trees_pickle_and_deepcopy(self):
+        node = ParentNode("p", [LeafNode("b", "x"), LeafNode("a", "y", {"href": "/z"})])
+        for copied in (pickle.loads(pickle.dumps(node)), copy.deepcopy(node)):
+            self.assertEqual(copied.to_html(), node.to_html())
+            self.assertIs(copied.props, node.props)
+            self.assertIs(copied.children[0].props, node.props)
+
+    def test_iter_html_joins_to_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+            LeafNode("a", "link", {"href": "/x"}),
+        ])
+        chunks = list(node.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), '<div><p>a <b>bold</b></p><a href="/x">link</a></div>')
+
+    def test_write_html(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, str(i))]) for i in range(3)])
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 1 + 5000 * len("<span></span>"))
+
+    def test_parent_without_tag_raises(self):
+        with self.assertRaises(ValueError):
+            ParentNode(None, [LeafNode(None, "x")]).to_html()
+
+    def test_attribute_values_are_escaped(self):
+        node = LeafNode("a", "x", {"href": '/q?a=1&b="2"<3>'})
+        self.assertEqual(node.to_html(), '<a href="/q?a=1&amp;b=&quot;2&quot;&lt;3&gt;">x</a>')
+        image = text_node_to_html_node(TextNode('say "hi" & <go>', TextType.IMAGE, "/i.png"))
+        self.assertEqual(image.to_html(), '<img src="/i.png" alt="say &quot;hi&quot; &amp; &lt;go&gt;"></img>')
+
+    def test_repeated_attributes_share_one_rendered_string(self):
+        a = LeafNode("a", "one", {"href": "/shared"}).props_to_html()
+        b = LeafNode("a", "two", {"href": "/shared"}).props_to_html()
+        self.assertEqual(a, ' href="/shared"')
+        self.assertIs(a, b)
+
+    def test_non_string_attribute_values_render_as_text(self):
+        rendered = [LeafNode("a", "x", {"value": v}).props_to_html() for v in (1, True, 1.0, 1)]
+        self.assertEqual(rendered, [' value="1"', ' value="True"', ' value="1.0"', ' value="1"'])
+        node = LeafNode("a", "x", {"class": ["a", "b"]})
+        self.assertEqual(node.props_to_html(), ' class="[\'a\', \'b\']"')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import contextlib, io, json, os, struct, unittest
+
+import images, png
+from assets import AssetMap
+from htmlnode import text_node_to_html_node
+from images import changed_images, derivative_url, gif_size, jpeg_size, scan_images, webp_size
+from main import build
+from textnode import TextNode, TextType
+from test_main import SiteTestCase
+
+
+class TestImageProps(unittest.TestCase):
+
+    def test_img_gets_srcset_and_size(self):
+        image = {"width": 1000, "height": 500, "srcset": [["/a-480w.png", 480], ["/a.png", 1000]]}
+        assets = AssetMap(images={"/a.png": image, "/b.png": dict(image, srcset=[["/b.png", 1000]])})
+        node = text_node_to_html_node(TextNode("A", TextType.IMAGE, "/a.png"), "/site/", assets)
+        self.assertEqual(node.to_html(), '<img src="/site/a.png" alt="A" srcset="/site/a-480w.png 480w, '
+                                         '/site/a.png 1000w" sizes="(max-width: 1000px) 100vw, 1000px" '
+                                         'width="1000" height="500"></img>')
+        node = text_node_to_html_node(TextNode("B", TextType.IMAGE, "/b.png"), "/", assets)
+        self.assertEqual(node.props, {"src": "/b.png", "alt": "B", "width": "1000", "height": "500"})
+        node = text_node_to_html_node(TextNode("C", TextType.IMAGE, "https://x/c.png"), "/", assets)
+        self.assertEqual(node.props, {"src": "https://x/c.png", "alt": "C"})
+
+    def test_digest_covers_images(self):
+        image = {"width": 10, "height": 5, "srcset": [["/a.png", 10]]}
+        self.assertNotEqual(AssetMap(images={"/a.png": image}).digest,
+                            AssetMap(images={"/a.png": dict(image, height=6)}).digest)
+        self.assertEqual(changed_images({"/a.png": image}, {"/a.png": dict(image, mtime=1)}), [])
+        self.assertEqual(changed_images({"/a.png": image}, {}), ["/a.png"])
+
+
+def jpeg(width, height):
+    # SOI, an APP1 segment to skip, then a baseline frame header
+    return (b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", 6) + b"Exif" +
+            b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 3) + b"\x00" * 6 + b"\xff\xd9")
+
+
+class TestHeaderSizes(unittest.TestCase):
+
+    def test_formats_read_without_pillow(self):
+        self.assertEqual(jpeg_size(io.BytesIO(jpeg(640, 480))), (640, 480))
+        self.assertEqual(gif_size(io.BytesIO(b"GIF89a" + struct.pack("<HH", 32, 16))), (32, 16))
+        riff = b"RIFF" + b"\x00" * 4 + b"WEBP"
+        lossy = riff + b"VP8 " + b"\x00" * 7 + b"\x9d\x01\x2a" + struct.pack("<HH", 300, 200)
+        self.assertEqual(webp_size(io.BytesIO(lossy)), (300, 200))
+        lossless = riff + b"VP8L" + b"\x00" * 4 + b"\x2f" + struct.pack("<I", 299 | 199 << 14) + b"\x00" * 5
+        self.assertEqual(webp_size(io.BytesIO(lossless)), (300, 200))
+        extended = riff + b"VP8X" + b"\x00" * 8 + (299).to_bytes(3, "little") + (199).to_bytes(3, "little")
+        self.assertEqual(webp_size(io.BytesIO(extended)), (300, 200))
+        for reader, data in ((jpeg_size, b"\xff\xd8\xff\xda"), (gif_size, b"GIF"), (webp_size, riff)):
+            with self.assertRaises(Exception):
+                reader(io.BytesIO(data))
+
+
+class TestResponsiveBuild(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = os.path.join(self.root, ".build", "images")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write_png("wide.png", 1000, 20)
+        self.write_png("small.png", 300, 10)
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![wide](/images/wide.png)")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![small](/images/small.png)")
+
+    def write_png(self, name, width, height):
+        rows = [bytes((x + y) % 256 for x in range(width * 3)) for y in range(height)]
+        with open(os.path.join(self.static, "images", name), "wb") as f:
+            f.write(png.encode(png.Image(width, height, 3, rows)))
+
+    def build(self, incremental=True, fingerprint=False):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", incremental=incremental, content_dir=self.content, static_dir=self.static,
+                  docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest,
+                  image_cache_dir=self.cache, fingerprint=fingerprint)
+        return out.getvalue()
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_variants_written_and_linked(self):
+        out = self.build()
+        self.assertIn("Resized images: 2 variants made, 2 copied (0 unchanged)", out)
+        with open(os.path.join(self.docs, "images", "wide-480w.png"), "rb") as f:
+            variant = png.decode(f.read())
+        self.assertEqual((variant.width, variant.height), (480, 10))
+        self.assertIn('<img src="/images/wide.png" alt="wide" srcset="/images/wide-480w.png 480w, '
+                      '/images/wide-960w.png 960w, /images/wide.png 1000w" sizes="(max-width: 1000px) 100vw, '
+                      '1000px" width="1000" height="20">', self.read("blog", "post.html"))
+        self.assertIn('<img src="/images/small.png" alt="small" width="300" height="10">', self.read("index.html"))
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+
+    def test_cached_variants_are_never_remade(self):
+        self.build()
+        self.build(incremental=False)
+        for name in os.listdir(os.path.join(self.docs, "images")):
+            os.remove(os.path.join(self.docs, "images", name))
+        out = self.build(incremental=False)
+        self.assertIn("Resized images: 0 variants made, 2 copied", out)
+
+    def test_changed_image_rerenders_its_pages(self):
+        self.build()
+        self.write_png("small.png", 600, 10)
+        out = self.build()
+        self.assertEqual(out.count("Generating page"), 1)
+        self.assertIn('/images/small-480w.png 480w', self.read("index.html"))
+        os.remove(os.path.join(self.static, "images", "wide.png"))
+        self.build()
+        self.assertEqual(sorted(os.listdir(os.path.join(self.docs, "images"))), ["small-480w.png", "small.png"])
+
+    def test_fingerprinted_variants(self):
+        self.build(fingerprint=True)
+        with open(self.manifest) as f:
+            served = json.load(f)["assets"]["/images/wide.png"]["url"]
+        self.assertIn(f'{derivative_url(served, 480)} 480w', self.read("blog", "post.html"))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, derivative_url(served, 960)[1:])))
+
+    def test_other_formats_sized_without_pillow(self):
+        pillow = images.Image
+        images.Image = None
+        self.addCleanup(setattr, images, "Image", pillow)
+        with open(os.path.join(self.static, "images", "photo.jpg"), "wb") as f:
+            f.write(jpeg(1200, 800))
+        entry = scan_images(self.static)["/images/photo.jpg"]
+        self.assertEqual((entry["width"], entry["height"], entry["widths"]), (1200, 800, []))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![photo](/images/photo.jpg)")
+        self.build()
+        self.assertIn('<img src="/images/photo.jpg" alt="photo" width="1200" height="800">', self.read("index.html"))
+
+    def test_scan_reuses_unchanged_entries(self):
+        entries = scan_images(self.static)
+        self.assertEqual(entries["/images/wide.png"]["widths"], [480, 960])
+        entries["/images/wide.png"]["height"] = 99
+        self.assertEqual(scan_images(self.static, entries)["/images/wide.png"]["height"], 99)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import contextlib, io, os, unittest
+
+from links import LinkIndex, check_links, find_links, scan_links
+from main import build
+from test_main import SiteTestCase
+
+
+class TestLinks(unittest.TestCase):
+
+    def test_find_links_with_lines(self):
+        md = "# T\n\nsee [a](/a) and\n![img](/i.png)\n\n```\n[not](/code)\n```\n\n- [b](b.html)"
+        self.assertEqual(find_links(md.splitlines()), [(3, "/a"), (4, "/i.png"), (10, "b.html")])
+
+    def test_link_wrapped_over_lines(self):
+        self.assertEqual(find_links(["text [two", "lines](/x)"]), [(1, "/x")])
+
+    def test_scan_links_passes_lines_through(self):
+        found = []
+        lines = ["[a](/a)\n", "\n", "b\n"]
+        self.assertEqual(list(scan_links(iter(lines), found)), lines)
+        self.assertEqual(found, [(1, "/a")])
+
+    def test_index_forms_and_resolution(self):
+        index = LinkIndex()
+        index.add("/blog/tom/index.html")
+        index.add("/about.html")
+        index.add("/index.html")
+        for url in ("/blog/tom", "/blog/tom/", "/about", "/about.html", "/"):
+            self.assertIn(url, index)
+        self.assertEqual(index.resolve("../x.png#top", "/blog/tom/index.html"), "/blog/x.png")
+        self.assertEqual(index.resolve("/blog/tom/?q=1"), "/blog/tom/")
+        for url in ("https://x.org", "//cdn/x", "#top", "mailto:a@b", ""):
+            self.assertIsNone(index.resolve(url))
+        self.assertEqual(list(index.dangling([(1, "/blog/tom"), (2, "/nope"), (3, "http://x")])), [(2, "/nope")])
+
+    def test_check_links(self):
+        pages = {"a.md": {"output": "docs/a/index.html", "links": [[1, "/b"], [2, "../missing.png"]]}}
+        outputs = list(pages.values()) + [{"output": "docs/b.html"}]
+        self.assertEqual(check_links(pages, outputs, "docs"), [("a.md", 2, "../missing.png")])
+
+
+class TestBuildLinkCheck(SiteTestCase):
+
+    def run_build(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", incremental=True, content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                  template_path=self.template, manifest_path=self.manifest, **kwargs)
+        return out.getvalue()
+
+    def test_reports_broken_links_with_location(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) [gone](/blog/gone)\n\n![css](/index.css)")
+        out = self.run_build()
+        self.assertIn(f"Broken link: {os.path.join(self.content, 'index.md')}:3: /blog/gone", out)
+        self.assertEqual(out.count("Broken link"), 1)
+
+    def test_unchanged_page_rechecked_when_target_removed(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.assertNotIn("Broken link", self.run_build())
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertIn("/blog/post", self.run_build())
+        with self.assertRaises(Exception):
+            self.run_build(strict_links=True)
+
+if __name__ == "__main__":
+    unittest.main()
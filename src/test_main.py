@@ -1,6 +1,7 @@
-import unittest
+import contextlib, io, json, os, shutil, tempfile, unittest
 
-from main import extract_title, generate_page
+import main
+from main import build, extract_title, generate_page
 
 class TestTextNode(unittest.TestCase):
 
@@ -30,3 +31,145 @@ class TestTextNode(unittest.TestCase):
         " theRightTitle"
         result = extract_title(markdown)
         self.assertRaises(Exception("No header in markdown"), result)
+
+
+class SiteTestCase(unittest.TestCase):
+    # builds a tiny site in a temp dir so build() never touches ./docs
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title><a href=\"/x\"></a>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nbody")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, basepath="/", incremental=True, jobs=1):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build(basepath, incremental=incremental, jobs=jobs, content_dir=self.content, static_dir=self.static,
+                  docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest)
+        return out.getvalue()
+
+
+class TestIncrementalBuild(SiteTestCase):
+
+    def test_first_build_generates_everything(self):
+        out = self.build()
+        self.assertEqual(out.count("Generating page"), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_unchanged_build_does_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), "")
+
+    def test_only_changed_page_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nchanged")
+        out = self.build()
+        self.assertEqual(out.count("Generating page"), 1)
+        self.assertIn("index.md", out)
+
+    def test_template_or_basepath_change_rebuilds_all(self):
+        self.build()
+        self.assertEqual(self.build("/site/").count("Generating page"), 2)
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.assertEqual(self.build("/site/").count("Generating page"), 2)
+
+    def test_removed_source_output_deleted(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_full_build_prunes_unknown_files_and_skips_unchanged_static(self):
+        self.build(incremental=False)
+        self.write(os.path.join(self.docs, "leftover.html"), "x")
+        out = self.build(incremental=False)
+        self.assertNotIn("Copied", out)
+        self.assertIn("Removing", out)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "leftover.html")))
+
+    def test_large_sources_streamed_with_same_output(self):
+        self.build(incremental=False)
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            expected = f.read()
+        threshold = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        self.addCleanup(setattr, main, "STREAM_THRESHOLD", threshold)
+        out = self.build(incremental=False)
+        self.assertIn("Streaming:", out)
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_deleted_output_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "index.css"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css")))
+
+
+class TestParallelBuild(SiteTestCase):
+
+    def test_parallel_matches_serial_output(self):
+        serial = self.build(incremental=False)
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            expected = f.read()
+        # static files are already in place, and so are identical pages
+        self.assertEqual(self.build(incremental=False, jobs=2),
+                         serial.split("\n", 1)[1] + "2 pages rendered identical to their output, left untouched\n")
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_worker_fragments_are_saved(self):
+        fragments = os.path.join(self.root, ".build", "fragments.json")
+        for expected in ("0 hits, 4 misses", "4 hits, 0 misses"):
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                build("/", jobs=2, content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                      template_path=self.template, manifest_path=self.manifest, fragment_cache_path=fragments)
+            self.assertIn(f"Fragment cache: {expected}", out.getvalue())
+        with open(fragments) as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+    def test_dead_worker_reported_per_page(self):
+        generate_page = main.generate_page
+        def crash(src_md, *args):
+            if src_md.endswith("post.md"):
+                os._exit(1)
+            return generate_page(src_md, *args)
+        main.generate_page = crash
+        self.addCleanup(setattr, main, "generate_page", generate_page)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            with self.assertRaisesRegex(Exception, "pages failed to build"):
+                build("/", incremental=True, jobs=2, content_dir=self.content, static_dir=self.static,
+                      docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest)
+        self.assertIn("Error generating " + os.path.join(self.content, "blog", "post.md") + ": BrokenProcessPool",
+                      out.getvalue())
+        main.generate_page = generate_page
+        self.assertIn("Generating page from " + os.path.join(self.content, "blog", "post.md"), self.build())
+
+    def test_page_errors_reported_and_retried(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "no heading")
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            with self.assertRaises(Exception):
+                build("/", incremental=True, jobs=2, content_dir=self.content, static_dir=self.static,
+                      docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest)
+        self.assertIn("Error generating " + os.path.join(self.content, "blog", "post.md"), out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Fixed")
+        self.assertEqual(self.build().count("Generating page"), 1)
@@ -0,0 +1,46 @@
+import os, shutil, tempfile, unittest
+
+from manifest import Manifest, hash_bytes, hash_file, load_manifest, save_manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_hash_file_matches_bytes(self):
+        path = os.path.join(self.root, "a.md")
+        with open(path, "wb") as f:
+            f.write(b"# Title\n")
+        self.assertEqual(hash_file(path), hash_bytes(b"# Title\n"))
+
+    def test_round_trip(self):
+        path = os.path.join(self.root, ".build", "manifest.json")
+        manifest = Manifest("/", "abc", {"content/index.md": {"hash": "1", "output": "docs/index.html"}})
+        save_manifest(manifest, path)
+        self.assertEqual(load_manifest(path), manifest)
+
+    def test_missing_or_corrupt_is_empty(self):
+        path = os.path.join(self.root, "manifest.json")
+        self.assertEqual(load_manifest(path), Manifest())
+        with open(path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(load_manifest(path), Manifest())
+
+    def test_is_current_requires_output(self):
+        out = os.path.join(self.root, "index.html")
+        entry = {"hash": "1", "output": out}
+        manifest = Manifest(pages={"index.md": entry})
+        self.assertFalse(manifest.is_current("pages", "index.md", entry))
+        open(out, "w").close()
+        self.assertTrue(manifest.is_current("pages", "index.md", entry))
+        self.assertFalse(manifest.is_current("pages", "index.md", {"hash": "2", "output": out}))
+
+    def test_stale_outputs(self):
+        manifest = Manifest(pages={"a.md": {"hash": "1", "output": "a.html"},
+                                   "b.md": {"hash": "1", "output": "b.html"}})
+        self.assertEqual(list(manifest.stale_outputs("pages", {"a.md": {}})), ["b.html"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from markdown_blocks import BlockType, markdown_to_blocks, block_to_block_type, markdown_to_html_node
+import io
+from markdown_blocks import Block, BlockType, markdown_to_blocks, block_to_block_type, markdown_to_html_node, iter_blocks, iter_typed_blocks, iter_markdown_html
 from src.htmlnode import LeafNode, HTMLNode, ParentNode
 
 class TestBlockMarkdown(unittest.TestCase):
@@ -227,5 +228,45 @@ This is a paragraph.
         "<div><h1>Heading</h1><p>This is a paragraph.</p><ul><li>List item 1</li><li>List item 2</li></ul><blockquote>A quote</blockquote></div>",
         )
 
+    def test_iter_blocks_from_file_lines(self):
+        md = "\n\n# Title\nMore\n\n```\ncode\n\nstill code\n```\n- a\n- b\n\n\nlast  \n"
+        self.assertEqual(list(iter_blocks(io.StringIO(md))), markdown_to_blocks(md))
+
+    def test_iter_markdown_html_matches_tree(self):
+        md = "# H\n\npara with [link](/x)\n\n1. one\n2. two\n\n> quote"
+        streamed = "".join(iter_markdown_html(iter_typed_blocks(io.StringIO(md)), "/site/"))
+        self.assertEqual(streamed, markdown_to_html_node(md, "/site/").to_html())
+
+    def test_iter_typed_blocks_is_lazy(self):
+        lines = iter(["# Title\n", "\n", "body\n"])
+        blocks = iter_typed_blocks(lines)
+        self.assertEqual(next(blocks), Block(BlockType.HEADING, ["# Title"]))
+        self.assertEqual(list(lines), ["body\n"])
+
+class TestTypedBlocks(unittest.TestCase):
+
+    def test_blocks_carry_type_lines_and_offsets(self):
+        md = "  # Title  \n\n- a\n- b \n\n```\ncode\n\nmore\n```\n1. x\n3. y\n\n> q\n>r"
+        blocks = list(iter_typed_blocks(md.splitlines()))
+        self.assertEqual([(b.type, b.lines, b.start, b.end) for b in blocks], [
+            (BlockType.HEADING, ["# Title"], 1, 2),
+            (BlockType.UNORDERED_LIST, ["- a", "- b"], 3, 5),
+            (BlockType.CODE, ["```", "code", "", "more", "```"], 6, 11),
+            (BlockType.PARAGRAPH, ["1. x", "3. y"], 11, 13),
+            (BlockType.QUOTE, ["> q", ">r"], 14, 16),
+        ])
+        self.assertEqual([b.text for b in blocks], markdown_to_blocks(md))
+
+    def test_stripped_last_line_reclassified(self):
+        blocks = list(iter_typed_blocks(["- a", "- "]))
+        self.assertEqual(blocks[0].type, BlockType.PARAGRAPH)
+        self.assertEqual(blocks[0].lines, ["- a", "-"])
+        self.assertEqual(block_to_block_type(blocks[0].text), BlockType.PARAGRAPH)
+
+    def test_unclosed_fence_is_paragraph(self):
+        blocks = list(iter_typed_blocks(["```", "code", "", "more", ""]))
+        self.assertEqual(blocks, [Block(BlockType.PARAGRAPH, ["```", "code", "", "more"])])
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import json, os, shutil, tempfile, unittest
+from unittest import mock
+
+import main
+from metadata import SiteIndex, has_front_matter, read_metadata, strip_front_matter
+from test_main import SiteTestCase
+
+
+class TestMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, "page.md")
+
+    def test_strip_front_matter(self):
+        meta = {}
+        lines = ["---", "title: Ring", "tags: [elf, dwarf]", "draft", "---", "# Heading", "", "body"]
+        self.assertEqual(list(strip_front_matter(lines, meta)), ["# Heading", "", "body"])
+        self.assertEqual(meta, {"title": "Ring", "tags": ["elf", "dwarf"]})
+
+    def test_unclosed_front_matter_is_content(self):
+        meta = {}
+        lines = ["---", "a: b", "text"]
+        self.assertEqual(list(strip_front_matter(lines, meta)), lines)
+        self.assertEqual(meta, {})
+
+    def test_has_front_matter_checks_first_line_only(self):
+        for text in ("---", " --- \na: b\n---", "---\r\na: b"):
+            self.assertTrue(has_front_matter(text), text)
+        for text in ("", "# Title\n---", "----\n", "--- x"):
+            self.assertFalse(has_front_matter(text), text)
+
+    def test_reads_only_the_head(self):
+        with open(self.path, "wb") as f:
+            f.write(b"---\ntags: [news]\n---\n\n# Big\n\nfirst\n\n" + b"x" * (1 << 20) + b"\xff")
+        self.assertEqual(read_metadata(self.path), {"tags": ["news"], "title": "Big"})
+
+    def test_site_index_queries(self):
+        index = SiteIndex([
+            {"url": "/b/", "title": "B", "tags": ["elf"], "date": "2024-02-01"},
+            {"url": "/a/", "title": "A", "tags": ["elf", "dwarf"], "date": "2024-03-01"},
+            {"url": "/", "title": "Home"},
+        ])
+        self.assertEqual([page["url"] for page in index], ["/", "/a/", "/b/"])
+        self.assertEqual([page["url"] for page in index.where(tags="dwarf")], ["/a/"])
+        self.assertEqual(len(index.where(title="B", tags="elf")), 1)
+        self.assertEqual([page["url"] for page in index.sorted_by("date", reverse=True)], ["/a/", "/b/"])
+        self.assertEqual(index.values("tags"), ["dwarf", "elf"])
+
+
+class TestBuildMetadata(SiteTestCase):
+
+    def test_metadata_cached_by_hash_and_indexed(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntags: [news]\n---\n# Post\n\nbody")
+        self.build()
+        with open(self.manifest) as f:
+            pages = json.load(f)["pages"]
+        self.assertEqual(pages[os.path.join(self.content, "blog", "post.md")]["meta"],
+                         {"tags": ["news"], "title": "Post"})
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), '<title>Post</title><a href="/x"></a><div><h1>Post</h1><p>body</p></div>')
+        with mock.patch("main.read_metadata", side_effect=read_metadata) as read:
+            self.build()
+            self.write(os.path.join(self.content, "index.md"), "# Welcome\n\nhello")
+            self.build()
+            index = main.scan_site(self.content, self.docs, self.manifest)
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual([(page["url"], page["title"]) for page in index],
+                         [("/", "Welcome"), ("/blog/post.html", "Post")])
+        self.assertEqual([page["src"] for page in index.where(tags="news")],
+                         [os.path.join(self.content, "blog", "post.md")])
+
+    def test_front_matter_title_used_for_page(self):
+        self.write(os.path.join(self.content, "index.md"), "---\ntitle: Front\n---\n# Heading\n\ntext")
+        self.build()
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<title>Front</title>"))
+
+    def test_indented_fence_read_the_same_when_rendered(self):
+        self.write(os.path.join(self.content, "index.md"), " ---  \ntitle: Front\n---\n# Heading\n\ntext")
+        self.build()
+        self.assertEqual(read_metadata(os.path.join(self.content, "index.md"))["title"], "Front")
+        with open(os.path.join(self.docs, "index.html")) as f:
+            html = f.read()
+        self.assertTrue(html.startswith("<title>Front</title>"))
+        self.assertNotIn("title: Front", html)
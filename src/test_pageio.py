@@ -0,0 +1,77 @@
+import os, shutil, tempfile, unittest
+
+import pageio
+from pageio import Writer, iter_lines, read_text, write_bytes
+from test_main import SiteTestCase
+
+
+class TestPageIO(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, "page.md")
+
+    def write_raw(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def test_read_matches_text_mode(self):
+        for data in (b"", b"# T\n\nbody\n", b"a\r\nb\rc\n", "é\n".encode() * 10):
+            self.write_raw(data)
+            with open(self.path) as f:
+                expected = f.read()
+            self.assertEqual(read_text(self.path), expected)
+            with open(self.path) as f:
+                self.assertEqual(list(iter_lines(self.path)), list(f))
+
+    def test_large_file_mapped(self):
+        self.write_raw(b"line\r\n" * (pageio.MMAP_THRESHOLD // 6 + 1))
+        text = read_text(self.path)
+        self.assertEqual(len(text), 5 * (pageio.MMAP_THRESHOLD // 6 + 1))
+        self.assertNotIn("\r", text)
+
+    def test_identical_write_skipped(self):
+        out = os.path.join(self.root, "out.html")
+        self.assertTrue(write_bytes(out, b"<p>a</p>"))
+        os.utime(out, (1, 1))
+        self.assertFalse(write_bytes(out, b"<p>a</p>"))
+        self.assertEqual(os.stat(out).st_mtime, 1)
+        self.assertTrue(write_bytes(out, b"<p>b</p>"))
+        self.assertEqual(os.listdir(self.root), ["out.html"])
+
+    def test_writer_flush_reports_each_path(self):
+        writer = Writer(2)
+        self.addCleanup(writer.close)
+        good = os.path.join(self.root, "good.html")
+        bad = os.path.join(self.root, "missing", "bad.html")
+        writer.write(good, b"x")
+        writer.write(bad, b"x")
+        outcomes = writer.flush()
+        self.assertIs(outcomes[good], True)
+        self.assertIsInstance(outcomes[bad], OSError)
+        writer.write(good, b"x")
+        self.assertEqual(writer.flush(), {good: False})
+        self.assertEqual((writer.written, writer.unchanged), (1, 1))
+
+    def test_stream_keeps_identical_file(self):
+        out = os.path.join(self.root, "out.html")
+        writer = Writer(0)
+        for _ in range(2):
+            with writer.stream(out) as f:
+                f.write("big")
+        self.assertEqual((writer.written, writer.unchanged), (1, 1))
+        self.assertEqual(os.listdir(self.root), ["out.html"])
+        self.assertEqual(writer.flush(), {out: False})
+
+
+class TestBuildWrites(SiteTestCase):
+
+    def test_full_rebuild_keeps_unchanged_mtimes(self):
+        self.build(incremental=False)
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.utime(post, (1, 1))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nchanged")
+        out = self.build(incremental=False)
+        self.assertIn("1 pages rendered identical", out)
+        self.assertEqual(os.stat(post).st_mtime, 1)
@@ -0,0 +1,104 @@
+import asyncio, contextlib, io, os, unittest
+
+import main
+
+from main import build
+from pipeline import Pipeline, Stage
+from test_main import SiteTestCase
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_items_flow_through_stages(self):
+        seen = []
+
+        async def double(item):
+            await asyncio.sleep(0)
+            return item * 2
+
+        async def odd_only(item):
+            return item if item % 4 else None
+
+        async def collect(item):
+            seen.append(item)
+
+        Pipeline([Stage("double", double, 3), Stage("filter", odd_only), Stage("collect", collect, 2)],
+                 depth=2).run_sync(range(10))
+        self.assertEqual(sorted(seen), [2, 6, 10, 14, 18])
+
+    def test_depth_bounds_items_in_flight(self):
+        counts = {"produced": 0, "consumed": 0, "most": 0}
+
+        async def produce(item):
+            counts["produced"] += 1
+            return item
+
+        async def slow(item):
+            counts["most"] = max(counts["most"], counts["produced"] - counts["consumed"])
+            await asyncio.sleep(0.001)
+            counts["consumed"] += 1
+
+        Pipeline([Stage("produce", produce, 4), Stage("slow", slow)], depth=3).run_sync(range(50))
+        self.assertEqual(counts["consumed"], 50)
+        # the queue between them, plus one item per producing worker
+        self.assertLessEqual(counts["most"], 3 + 4)
+
+    def test_depth_must_be_positive(self):
+        with self.assertRaises(Exception):
+            Pipeline([], depth=0)
+
+
+class TestPipelinedBuild(SiteTestCase):
+
+    def run_build(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                  template_path=self.template, manifest_path=self.manifest, **kwargs)
+        return out.getvalue()
+
+    def read_outputs(self):
+        outputs = {}
+        for name in ("index.html", os.path.join("blog", "post.html")):
+            with open(os.path.join(self.docs, name)) as f:
+                outputs[name] = f.read()
+        return outputs
+
+    def test_same_output_and_log_as_serial(self):
+        serial = self.run_build().split("\n", 1)[1]
+        expected = self.read_outputs()
+        for path in expected:
+            os.remove(os.path.join(self.docs, path))
+        for jobs in (1, 2):
+            self.assertEqual(self.run_build(jobs=jobs, queue_depth=1), serial)
+            self.assertEqual(self.read_outputs(), expected)
+            for path in expected:
+                os.remove(os.path.join(self.docs, path))
+
+    def test_page_error_reported(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "no heading")
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            with self.assertRaises(Exception):
+                build("/", content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                      template_path=self.template, manifest_path=self.manifest, queue_depth=4)
+        self.assertIn("Error generating " + os.path.join(self.content, "blog", "post.md"), out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_pool_failure_reported_per_page(self):
+        def broken(job, markdown=None):
+            raise RuntimeError("worker died")
+        render_job = main.render_job
+        main.render_job = broken
+        self.addCleanup(setattr, main, "render_job", render_job)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            with self.assertRaisesRegex(Exception, "2 of 2 pages failed"):
+                build("/", content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                      template_path=self.template, manifest_path=self.manifest, queue_depth=4)
+        self.assertIn("Error generating " + os.path.join(self.content, "index.md") + ": RuntimeError: worker died",
+                      out.getvalue())
+
+    def test_streamed_identical_pages_left_untouched(self):
+        threshold = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        self.addCleanup(setattr, main, "STREAM_THRESHOLD", threshold)
+        self.assertNotIn("identical", self.run_build(queue_depth=4))
+        self.assertIn("2 pages rendered identical", self.run_build(queue_depth=4))
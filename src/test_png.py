@@ -0,0 +1,83 @@
+import random, struct, unittest, zlib
+
+import png
+
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+def filtered(rows, bpp, kind):
+    # the reference filters from the PNG spec, one byte at a time
+    out = []
+    prev = bytes(len(rows[0]))
+    for row in rows:
+        line = bytearray([kind])
+        for i, x in enumerate(row):
+            a = row[i - bpp] if i >= bpp else 0
+            c = prev[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            predictor = [0, a, b, (a + b) // 2, paeth(a, b, c)][kind]
+            line.append((x - predictor) & 255)
+        out.append(bytes(line))
+        prev = row
+    return b"".join(out)
+
+def encoded(width, height, color_type, data, extra=b""):
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (png.SIGNATURE + png._chunk(b"IHDR", header) + extra +
+            png._chunk(b"IDAT", zlib.compress(data)) + png._chunk(b"IEND", b""))
+
+def random_image(rng, width, height, channels):
+    return png.Image(width, height, channels,
+                     [bytes(rng.randrange(256) for _ in range(width * channels)) for _ in range(height)])
+
+
+class TestPNG(unittest.TestCase):
+
+    def test_every_filter_decodes(self):
+        rng = random.Random(1)
+        for channels, color_type in ((1, 0), (2, 4), (3, 2), (4, 6)):
+            image = random_image(rng, 7, 5, channels)
+            for kind in range(5):
+                data = encoded(7, 5, color_type, filtered(image.rows, channels, kind))
+                self.assertEqual(png.decode(data), image, (channels, kind))
+
+    def test_encode_round_trip(self):
+        image = random_image(random.Random(2), 9, 4, 4)
+        data = png.encode(image)
+        self.assertEqual(png.decode(data), image)
+        header = png.parse_header(next(png.iter_chunks(data))[1])
+        self.assertEqual((header.width, header.height, header.color_type, header.supported), (9, 4, 6, True))
+
+    def test_palette_expanded(self):
+        palette = png._chunk(b"PLTE", b"\x00\x00\x00\xff\x00\x00\x00\xff\x00")
+        data = encoded(3, 1, 3, b"\x00\x00\x01\x02", palette)
+        self.assertEqual(png.decode(data).rows, [b"\x00\x00\x00\xff\x00\x00\x00\xff\x00"])
+        transparent = palette + png._chunk(b"tRNS", b"\x00")
+        image = png.decode(encoded(3, 1, 3, b"\x00\x00\x01\x02", transparent))
+        self.assertEqual((image.channels, image.rows), (4, [b"\x00\x00\x00\x00\xff\x00\x00\xff\x00\xff\x00\xff"]))
+
+    def test_unsupported_rejected(self):
+        header = struct.pack(">IIBBBBB", 1, 1, 16, 0, 0, 0, 0)
+        data = png.SIGNATURE + png._chunk(b"IHDR", header) + png._chunk(b"IEND", b"")
+        with self.assertRaises(Exception):
+            png.decode(data)
+        with self.assertRaises(Exception):
+            png.decode(b"GIF89a")
+
+    def test_resize_averages_blocks(self):
+        image = png.Image(4, 2, 1, [bytes([0, 10, 100, 200]), bytes([20, 30, 100, 101])])
+        self.assertEqual(png.resize(image, 2, 1).rows, [bytes([15, 125])])
+        self.assertEqual(png.resize(image, 3, 2).rows, [bytes([0, 10, 150]), bytes([20, 30, 101])])
+        rgb = png.Image(2, 1, 3, [bytes([0, 100, 255, 10, 0, 255])])
+        self.assertEqual(png.resize(rgb, 1, 1).rows, [bytes([5, 50, 255])])
+        with self.assertRaises(Exception):
+            png.resize(image, 5, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextlib, io, json, os, unittest
+
+from main import build
+from profiler import STAGES, BuildProfile, percentile, profile_page, stage, timed, timed_iter
+from test_main import SiteTestCase
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+        self.assertEqual(percentile([], 90), 0)
+
+    def test_timers_are_noops_outside_a_page(self):
+        self.assertEqual(timed("x", len)("abc"), 3)
+        self.assertEqual(list(timed_iter("x", "ab")), ["a", "b"])
+        with stage("read"):
+            pass
+
+    def test_nested_stages_are_exclusive(self):
+        with profile_page("a.md") as page:
+            with stage("write"):
+                list(timed_iter("to_html", iter(range(100))))
+            timed("text_to_textnodes", sum)(range(1000))
+        self.assertEqual(sum(page.stages.values()), page.total_ns)
+        self.assertEqual([event[0] for event in page.events], ["write"])
+        self.assertGreater(page.stages["to_html"], 0)
+
+
+class TestProfiledBuild(SiteTestCase):
+
+    def test_report_json_and_trace(self):
+        profile = BuildProfile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build("/", jobs=2, content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                  template_path=self.template, manifest_path=self.manifest, profile=profile)
+        self.assertEqual(sorted(page.src for page in profile.pages),
+                         [os.path.join(self.content, "blog", "post.md"), os.path.join(self.content, "index.md")])
+        self.assertTrue(all(page.bytes_out > 0 for page in profile.pages))
+        report = profile.report(top=1)
+        for name in STAGES:
+            self.assertIn(name, report)
+        self.assertIn("Slowest 1 pages", report)
+
+        path = os.path.join(self.root, "profile.json")
+        profile.write_json(path, top=1)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data["pages"], 2)
+        self.assertEqual(len(data["slowest"]), 1)
+
+        path = os.path.join(self.root, "trace.json")
+        profile.write_chrome_trace(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(sum(event["cat"] == "page" for event in events), 2)
+        self.assertIn("markdown_to_html_node", {event["name"] for event in events})
+
+if __name__ == "__main__":
+    unittest.main()
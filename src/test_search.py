@@ -0,0 +1,87 @@
+import contextlib, io, json, os, shutil, tempfile, unittest
+
+from main import build
+from search import SearchIndex, count_terms, decode_postings, shard_name, tokenize
+from test_main import SiteTestCase
+
+
+class TestSearch(unittest.TestCase):
+
+    def test_tokenize_drops_link_targets(self):
+        self.assertEqual(tokenize("See the [Shire](/blog/shire) and **Mordor**!"), ["see", "the", "shire", "and", "mordor"])
+
+    def test_tokenize_drops_inline_markup(self):
+        self.assertEqual(tokenize("an _italic_ word, **bold _both_**"), ["an", "italic", "word", "bold", "both"])
+        self.assertEqual(tokenize("the _legendarium_ ![_Map_](/m.png) `snake_case`"),
+                         ["the", "legendarium", "map", "snake", "case"])
+
+    def test_count_terms_skips_fence_markers(self):
+        self.assertEqual(count_terms(["# Ring ring", "```", "let x", "```"]), {"ring": 2, "let": 1})
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("hobbit"), "ho")
+        self.assertEqual(shard_name("éowyn"), "x" + "éo".encode().hex())
+
+    def test_postings_gap_encoded_by_url(self):
+        index = SearchIndex()
+        index.add_page("/c/", "C", {"ring": 3})
+        index.add_page("/a/", "A", {"ring": 1, "elf": 2})
+        index.add_page("/b/", "B", {"elf": 1})
+        shards = index.shards()
+        self.assertEqual(shards["ri"]["ring"], [0, 1, 2, 3])
+        self.assertEqual(decode_postings(shards["el"]["elf"]), [(0, 2), (1, 1)])
+
+    def test_write_removes_stale_shards(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        out = os.path.join(root, "search")
+        index = SearchIndex()
+        index.add_page("/", "Home", {"zebra": 1})
+        index.write(out)
+        index = SearchIndex()
+        index.add_page("/", "Home", {"ring": 1})
+        written = index.write(out)
+        self.assertEqual(sorted(os.listdir(out)), ["index.json", "ri.json"])
+        self.assertEqual(len(written), 2)
+        with open(os.path.join(out, "index.json")) as f:
+            self.assertEqual(json.load(f), {"prefix_length": 2, "shards": ["ri"], "pages": [["/", "Home"]]})
+
+
+class TestBuildSearch(SiteTestCase):
+
+    def run_build(self, search=True):
+        terms_path = os.path.join(self.root, ".build", "search-terms.json") if search else None
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            build("/", incremental=True, content_dir=self.content, static_dir=self.static, docs_dir=self.docs,
+                  template_path=self.template, manifest_path=self.manifest, search_terms_path=terms_path)
+        return out.getvalue()
+
+    def shard(self, name):
+        with open(os.path.join(self.docs, "search", name + ".json")) as f:
+            return json.load(f)
+
+    def test_index_written_and_kept_across_incremental_builds(self):
+        self.run_build()
+        self.assertEqual(self.shard("he")["hello"], [0, 1])
+        self.assertEqual(self.shard("bo")["body"], [1, 1])
+        with open(os.path.join(self.docs, "search", "index.json")) as f:
+            self.assertEqual(json.load(f)["pages"], [["/", "Home"], ["/blog/post.html", "Post"]])
+        # only the post is re-rendered; the home page's terms come from the cache
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nhello again")
+        out = self.run_build()
+        self.assertNotIn(os.path.join(self.content, "index.md"), out)
+        self.assertEqual(self.shard("he")["hello"], [0, 1, 1, 1])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "bo.json")))
+
+    def test_unchanged_pages_indexed_when_search_turned_on(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntitle: Front\n---\n# Post\n\nbody _text_")
+        self.run_build(search=False)
+        out = self.run_build()
+        self.assertNotIn("Generating page", out)
+        self.assertIn("Search index: 2 pages", out)
+        self.assertEqual(self.shard("te")["text"], [1, 1])
+        with open(os.path.join(self.docs, "search", "index.json")) as f:
+            self.assertEqual(json.load(f)["pages"], [["/", "Home"], ["/blog/post.html", "Front"]])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "ti.json")))
+        os.remove(os.path.join(self.root, ".build", "search-terms.json"))
+        self.assertIn("Search index: 2 pages", self.run_build())
@@ -0,0 +1,69 @@
+import contextlib, io, os, unittest
+
+from main import build
+from serve import SiteWatcher, diff_snapshots, scan_tree
+from test_main import SiteTestCase
+
+
+class TestSiteWatcher(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            manifest = build("/", incremental=True, content_dir=self.content, static_dir=self.static,
+                             docs_dir=self.docs, template_path=self.template, manifest_path=self.manifest)
+        self.watcher = SiteWatcher(manifest, "/", self.content, self.static, self.docs, self.template)
+
+    def poll(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            rebuilt = self.watcher.poll()
+        return rebuilt, out.getvalue()
+
+    def touch(self, path, text):
+        self.write(path, text)
+        # make sure the stamp changes even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.poll(), (0, ""))
+
+    def test_edit_rebuilds_only_that_page(self):
+        self.touch(os.path.join(self.content, "blog", "post.md"), "# Post\n\nedited")
+        rebuilt, out = self.poll()
+        self.assertEqual(rebuilt, 1)
+        self.assertIn("post.md", out)
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertIn("edited", f.read())
+
+    def test_touch_without_change_skipped(self):
+        path = os.path.join(self.content, "index.md")
+        with open(path) as f:
+            self.touch(path, f.read())
+        self.assertEqual(self.poll()[0], 0)
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.touch(self.template, "<main>{{ Content }}</main>")
+        self.assertEqual(self.poll()[0], 2)
+
+    def test_new_and_removed_files(self):
+        self.touch(os.path.join(self.content, "new.md"), "# New")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.assertEqual(self.poll()[0], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "new.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_page_error_keeps_watching(self):
+        self.touch(os.path.join(self.content, "index.md"), "no heading")
+        rebuilt, out = self.poll()
+        self.assertEqual(rebuilt, 1)
+        self.assertIn("Error generating", out)
+
+    def test_scan_and_diff(self):
+        snapshot = scan_tree(self.content, ".md")
+        self.assertEqual(sorted(snapshot), [os.path.join(self.content, "blog", "post.md"),
+                                            os.path.join(self.content, "index.md")])
+        self.assertEqual(diff_snapshots({"a": 1, "b": 1}, {"a": 2, "c": 1}), (["a", "c"], ["b"]))
+
+if __name__ == "__main__":
+    unittest.main()
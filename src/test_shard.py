@@ -0,0 +1,120 @@
+import argparse, contextlib, io, os, subprocess, sys, unittest
+
+from main import build, merge, parse_args
+from manifest import Manifest, save_manifest
+from shard import in_shard, merge_shards, parse_shard, shard_of, shard_paths
+from test_main import SiteTestCase
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestShard(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+        with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            parse_args(["--shard", "5/3"])
+        self.assertIn("shard index must be between 1 and 3, got 5", err.getvalue())
+
+    def test_partition_is_stable_and_complete(self):
+        paths = [f"d{i % 7}/page-{i}.md" for i in range(200)]
+        owners = [[in_shard(path, (i, 3)) for i in (1, 2, 3)] for path in paths]
+        self.assertTrue(all(sum(flags) == 1 for flags in owners))
+        self.assertEqual(shard_of("blog/post.md", 3), shard_of(os.path.join("blog", "post.md"), 3))
+        # sha256-based, so the same on every machine
+        self.assertEqual([shard_of(f"page-{i}.md", 4) for i in range(6)], [3, 4, 4, 3, 4, 3])
+        self.assertEqual(len({shard_of(path, 3) for path in paths}), 3)
+
+
+class TestShardedBuild(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.shards = os.path.join(self.root, ".build", "shards")
+        for i in range(6):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# P{i}\n\n[home](/)")
+
+    def build_shard(self, shard):
+        docs, manifest = shard_paths(self.shards, shard)
+        with contextlib.redirect_stdout(io.StringIO()):
+            build("/", content_dir=self.content, static_dir=self.static, docs_dir=docs,
+                  template_path=self.template, manifest_path=manifest, shard=shard)
+
+    def run_merge(self, count):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            merge(count, self.shards, self.docs, self.manifest)
+        return out.getvalue()
+
+    def tree(self, root):
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                with open(os.path.join(dirpath, name)) as f:
+                    files[os.path.relpath(os.path.join(dirpath, name), root)] = f.read()
+        return files
+
+    def test_merge_matches_single_build(self):
+        self.build(incremental=False)
+        expected = self.tree(self.docs)
+        self.assertEqual(len(expected), 9)
+        self.write(os.path.join(self.docs, "leftover.html"), "")
+        for i in (1, 2, 3):
+            self.build_shard((i, 3))
+        out = self.run_merge(3)
+        self.assertIn("Merged 3 shards: 8 pages, 1 static files", out)
+        self.assertIn("leftover.html", out)
+        self.assertEqual(self.tree(self.docs), expected)
+        self.assertEqual(self.build(), "")
+
+    def test_merge_compresses_and_keeps_current_siblings(self):
+        with self.assertRaisesRegex(Exception, "when shards are merged"):
+            build("/", content_dir=self.content, docs_dir=self.docs, template_path=self.template,
+                  shard=(1, 2), compress=True)
+        with self.assertRaisesRegex(Exception, "search needs an unsharded build"):
+            build("/", content_dir=self.content, docs_dir=self.docs, template_path=self.template,
+                  shard=(1, 2), search_terms_path=os.path.join(self.root, "terms.json"))
+        for i in (1, 2):
+            self.build_shard((i, 2))
+        for expected in ("Compressed 9 outputs (0 unchanged)", "Merged 2 shards"):
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                merge(2, self.shards, self.docs, self.manifest, compress=True)
+            self.assertIn(expected, out.getvalue())
+        self.assertNotIn("Compressed", out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "p5.html.gz")))
+
+    def test_missing_shard_and_conflicts_rejected(self):
+        self.build_shard((1, 2))
+        with self.assertRaisesRegex(Exception, "missing shard builds: 2/2"):
+            self.run_merge(2)
+        # a second shard claiming shard 1's outputs
+        docs1, manifest1 = shard_paths(self.shards, (1, 2))
+        docs2, manifest2 = shard_paths(self.shards, (2, 2))
+        with open(manifest1) as f:
+            data = f.read()
+        os.makedirs(os.path.dirname(manifest2), exist_ok=True)
+        with open(manifest2, "w") as f:
+            f.write(data.replace(docs1, docs2))
+        with self.assertRaisesRegex(Exception, "cannot merge shards") as raised:
+            self.run_merge(2)
+        self.assertIn("built by shards 1 and 2", str(raised.exception))
+        self.assertFalse(os.path.exists(self.docs) and os.listdir(self.docs))
+
+    def test_different_template_is_a_conflict(self):
+        for i in (1, 2):
+            docs, manifest = shard_paths(self.shards, (i, 2))
+            save_manifest(Manifest("/", f"template-{i}"), manifest)
+        with self.assertRaisesRegex(Exception, "shard 2/2 was built with a different basepath or template"):
+            merge_shards(self.shards, 2, self.docs)
+
+    def test_shards_as_separate_processes(self):
+        # the CLI end to end: N processes on one machine, then merge
+        procs = [subprocess.Popen([sys.executable, MAIN, "--shard", f"{i}/3"], cwd=self.root,
+                                  stdout=subprocess.DEVNULL) for i in (1, 2, 3)]
+        self.assertEqual([proc.wait() for proc in procs], [0, 0, 0])
+        merged = subprocess.run([sys.executable, MAIN, "merge", "3"], cwd=self.root, capture_output=True, text=True)
+        self.assertEqual(merged.returncode, 0, merged.stderr)
+        self.assertIn("Merged 3 shards: 8 pages", merged.stdout)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "docs", "blog", "p5.html")))
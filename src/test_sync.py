@@ -0,0 +1,71 @@
+import os, shutil, tempfile, unittest
+
+from sync import copy_file, is_synced, prune_tree, scan_files, sync_tree
+
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.src = os.path.join(self.root, "static")
+        self.dst = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png" * 1000)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_scan_files(self):
+        self.assertEqual(sorted(scan_files(self.src)), [os.path.join("images", "a.png"), "index.css"])
+
+    def test_sync_copies_then_skips(self):
+        result = sync_tree(self.src, self.dst)
+        self.assertEqual(len(result.copied), 2)
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "a.png")), "png" * 1000)
+        self.assertEqual(set(result.entries), {os.path.join(self.src, "index.css"),
+                                               os.path.join(self.src, "images", "a.png")})
+        again = sync_tree(self.src, self.dst)
+        self.assertEqual((again.copied, again.skipped), ([], 2))
+
+    def test_changed_file_recopied(self):
+        sync_tree(self.src, self.dst)
+        path = os.path.join(self.src, "index.css")
+        self.write(path, "body { color: red }")
+        result = sync_tree(self.src, self.dst, workers=1)
+        self.assertEqual(result.copied, [os.path.join(self.dst, "index.css")])
+        self.assertEqual(self.read(os.path.join(self.dst, "index.css")), "body { color: red }")
+
+    def test_checksum_skips_touched_file(self):
+        sync_tree(self.src, self.dst)
+        path = os.path.join(self.src, "index.css")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertFalse(is_synced(path, os.stat(path), os.path.join(self.dst, "index.css")))
+        self.assertTrue(is_synced(path, os.stat(path), os.path.join(self.dst, "index.css"), checksum=True))
+        self.assertTrue(is_synced(path, os.stat(path), os.path.join(self.dst, "index.css")))
+
+    def test_hardlink_replaced_not_written_through(self):
+        src = os.path.join(self.src, "index.css")
+        dst = os.path.join(self.dst, "index.css")
+        copy_file(src, dst, link=True)
+        self.assertTrue(os.path.samefile(src, dst))
+        self.write(os.path.join(self.root, "other.css"), "other")
+        copy_file(os.path.join(self.root, "other.css"), dst)
+        self.assertEqual(self.read(src), "body {}")
+
+    def test_prune_tree(self):
+        sync_tree(self.src, self.dst)
+        removed = prune_tree(self.dst, [os.path.join(self.dst, "index.css")])
+        self.assertEqual(removed, [os.path.join(self.dst, "images", "a.png")])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.css")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os, shutil, tempfile, unittest
+
+from template import Template, load_template, rewrite_root_urls
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>x</p>"}),
+            "<title>Hi</title><article><p>x</p></article>",
+        )
+
+    def test_streamed_value(self):
+        template = Template("<a>{{ Content }}</a>")
+        self.assertEqual(template.render({"Content": iter(["<p>", "x", "</p>"])}), "<a><p>x</p></a>")
+
+    def test_missing_slot_left_as_written(self):
+        template = Template("{{ Title }} {{Other}}")
+        self.assertEqual(template.render({"Title": "T"}), "T {{Other}}")
+
+    def test_basepath_rewritten_in_literals_only(self):
+        template = Template('<link href="/index.css" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": '<p>href="/x"</p>'}),
+            '<link href="/site/index.css" /><p>href="/x"</p>',
+        )
+
+    def test_rewrite_root_urls(self):
+        self.assertEqual(rewrite_root_urls('<img src="/a.png">', "/b/"), '<img src="/b/a.png">')
+        self.assertEqual(rewrite_root_urls('<img src="/a.png">'), '<img src="/a.png">')
+
+    def test_load_template_cached_until_changed(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, "template.html")
+        with open(path, "w") as f:
+            f.write("{{ Title }}")
+        first = load_template(path)
+        self.assertIs(load_template(path), first)
+        self.assertIsNot(load_template(path, "/site/"), first)
+        with open(path, "w") as f:
+            f.write("<h1>{{ Title }}</h1>")
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(load_template(path).render({"Title": "T"}), "<h1>T</h1>")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_links, text_to_textnodes
+from textnode import TextNode, TextType, split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_links, text_to_textnodes, iter_markdown_images, iter_markdown_links
 
 
 class TestTextNode(unittest.TestCase):
@@ -9,6 +9,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(node, node2)
     
+    def test_slotted(self):
+        node = TextNode("x", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
     def test_node_works(self):
         node = TextNode("This is a text node", TextType.BOLD)
         node2 = TextNode("This is a text node_2", TextType.BOLD)
@@ -73,6 +79,21 @@ class TestTextNode(unittest.TestCase):
         )
         self.assertListEqual([("to boot dev", "https://www.boot.dev")], matches)
 
+    def test_iter_markdown_spans(self):
+        text = "a ![i](x.png) [l](/u) ![j](y)"
+        self.assertEqual(list(iter_markdown_images(text)), [(2, 13, "i", "x.png"), (22, 29, "j", "y")])
+        self.assertEqual(list(iter_markdown_links(text)), [(14, 21, "l", "/u")])
+        for start, end, alt, url in iter_markdown_links(text):
+            self.assertEqual(text[start:end], f"[{alt}]({url})")
+
+    def test_split_links_repeated_text(self):
+        node = TextNode("[a](b) and [a](b)", TextType.TEXT)
+        self.assertEqual(split_nodes_links([node]), [
+            TextNode("a", TextType.LINK, "b"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "b"),
+        ])
+
     def test_split_images(self):
         node = TextNode(
             "This is text with an ![image](https://i.imgur.com/zjjcJKZ.png) and another ![second image](https://i.imgur.com/3elNhQu.png)",
@@ -162,5 +183,28 @@ class TestTextNode(unittest.TestCase):
         assert any(n.text_type == TextType.LINK and n.text == "a" and n.url == "u1" for n in nodes)
         assert any(n.text_type == TextType.IMAGE and n.text == "b" and n.url == "u2" for n in nodes)
 
+    def test_matches_chained_passes(self):
+        cases = [
+            "",
+            "a `b **c** d",
+            "**bold** and `code **not bold**` _it_",
+            "![img](a.png)[link](b) text ![a[b](c) ![x](y(z))",
+            "!![a](b) [a](b)![c](d)",
+            "_a [l](u) b_ `x` ****",
+        ]
+        for text in cases:
+            nodes = [TextNode(text, TextType.TEXT)]
+            nodes = split_nodes_links(split_nodes_image(nodes))
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            self.assertEqual(text_to_textnodes(text), nodes, text)
+
+    def test_many_links(self):
+        text = " ".join(f"[l{i}](/p/{i})" for i in range(2000))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 3999)
+        self.assertEqual(nodes[-1], TextNode("l1999", TextType.LINK, "/p/1999"))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -11,6 +11,7 @@ class TextType(Enum):
     DEFAULT = "default"  # keep for tests
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
 
     def __init__(self, text="", text_type = None, url = None):
         self.text = text
@@ -52,63 +53,102 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
                     new_nodes.append(TextNode(part, text_type))
     return new_nodes
 
+IMAGE_PATTERN = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+LINK_PATTERN = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
+IMAGE_RE = re.compile(IMAGE_PATTERN)
+LINK_RE = re.compile(LINK_PATTERN)
+
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_RE.findall(text)
 
 def extract_markdown_links(links):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", links)
+    return LINK_RE.findall(links)
 
-def split_nodes_image(old_nodes):
+def iter_markdown_images(text):
+    # (start, end, alt, url) of every image, leftmost first
+    for match in IMAGE_RE.finditer(text):
+        yield match.start(), match.end(), match.group(1), match.group(2)
+
+def iter_markdown_links(text):
+    # (start, end, text, url) of every link that isn't an image
+    for match in LINK_RE.finditer(text):
+        yield match.start(), match.end(), match.group(1), match.group(2)
+
+def _split_nodes_spans(old_nodes, iter_spans, text_type):
+    # one scan per node: the text between spans is sliced out by position
+    # instead of re-searching what's left after every match
     new_nodes = []
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
 
-        remaining = node.text
-        while True:
-            matches = extract_markdown_images(remaining)
-            if not matches:
-                if remaining:
-                    new_nodes.append(TextNode(remaining, TextType.TEXT))
-                break
-
-            alt, url = matches[0]
-            before, after = remaining.split(f"![{alt}]({url})", 1)
-            if before:
-                new_nodes.append(TextNode(before, TextType.TEXT))
-            new_nodes.append(TextNode(alt, TextType.IMAGE, url))
-            remaining = after
+        text = node.text
+        pos = 0
+        for start, end, alt, url in iter_spans(text):
+            if start > pos:
+                new_nodes.append(TextNode(text[pos:start], TextType.TEXT))
+            new_nodes.append(TextNode(alt, text_type, url))
+            pos = end
+        if pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
     return new_nodes
 
+def split_nodes_image(old_nodes):
+    return _split_nodes_spans(old_nodes, iter_markdown_images, TextType.IMAGE)
+
 def split_nodes_links(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
+    return _split_nodes_spans(old_nodes, iter_markdown_links, TextType.LINK)
 
-        remaining = node.text
-        while True:
-            matches = extract_markdown_links(remaining)
-            if not matches:
-                if remaining:
-                    new_nodes.append(TextNode(remaining, TextType.TEXT))
-                break
-
-            alt, url = matches[0]
-            before, after = remaining.split(f"[{alt}]({url})", 1)
-            if before:
-                new_nodes.append(TextNode(before, TextType.TEXT))
-            new_nodes.append(TextNode(alt, TextType.LINK, url))
-            remaining = after
-    return new_nodes
+# images and links in one leftmost scan; a link may not follow "!" so an
+# image that failed to match is never picked up as a link either
+INLINE_LINK_RE = re.compile(IMAGE_PATTERN + "|" + LINK_PATTERN)
+
+# applied innermost-last, same order as the old chained passes
+INLINE_DELIMITERS = (
+    ("`", TextType.CODE),
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+)
+
+def _split_delimiters(text, out, level=0):
+    if level == len(INLINE_DELIMITERS):
+        out.append(TextNode(text, TextType.TEXT))
+        return
+    delimiter, text_type = INLINE_DELIMITERS[level]
+    if delimiter not in text:
+        _split_delimiters(text, out, level + 1)
+        return
+    parts = text.split(delimiter)
+    # unmatched delimiter → whole run stays text for the next delimiter
+    if len(parts) % 2 == 0:
+        _split_delimiters(text, out, level + 1)
+        return
+    for i, part in enumerate(parts):
+        if not part:
+            continue
+        if i % 2 == 0:
+            _split_delimiters(part, out, level + 1)
+        else:
+            out.append(TextNode(part, text_type))
 
 def text_to_textnodes(text):
-    start_list = [TextNode(text, TextType.TEXT)]
-    split_image = split_nodes_image(start_list)
-    split_links = split_nodes_links(split_image)
-    split_code = split_nodes_delimiter(split_links, "`", TextType.CODE)
-    split_bold = split_nodes_delimiter(split_code, "**", TextType.BOLD)
-    split_line = split_nodes_delimiter(split_bold, "_", TextType.ITALIC)
-    return split_line
+    # Single left-to-right pass: every text run between two links/images is
+    # split on the delimiters as soon as it is found, so no intermediate
+    # node lists are built. Produces the same nodes as chaining
+    # split_nodes_image, split_nodes_links and split_nodes_delimiter.
+    nodes = []
+    pos = 0
+    for match in INLINE_LINK_RE.finditer(text):
+        start = match.start()
+        if start > pos:
+            _split_delimiters(text[pos:start], nodes)
+        alt, url, label, href = match.groups()
+        if url is not None:
+            nodes.append(TextNode(alt, TextType.IMAGE, url))
+        else:
+            nodes.append(TextNode(label, TextType.LINK, href))
+        pos = match.end()
+    if pos < len(text):
+        _split_delimiters(text[pos:], nodes)
+    return nodes